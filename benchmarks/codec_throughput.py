@@ -0,0 +1,64 @@
+"""消息编解码的吞吐量
+
+生成 N 条消息事件 (默认 100k, 包含文本, Markdown 与 Emoji 元素, 一半带时区),
+分别测量 JSON Lines 与二进制流的写入与读取速度, 以及文件大小.
+
+    python benchmarks/codec_throughput.py [消息数]
+"""
+
+import io
+import sys
+import time
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from nonechat.model import User, Channel, MessageEvent
+from nonechat.message import Text, Emoji, Markdown, ConsoleMessage
+from nonechat.codec import dump_jsonl, load_jsonl, dump_stream, load_stream
+
+
+def events(count: int) -> list[MessageEvent]:
+    user = User("u1", nickname="user")
+    channel = Channel("c1", "channel")
+    start = datetime.now()
+    tz = timezone(timedelta(hours=8))
+    return [
+        MessageEvent(
+            start if index % 2 else start.astimezone(tz),
+            "robot",
+            "console.message",
+            user,
+            channel,
+            f"id{index}",
+            ConsoleMessage([Text(f"message {index}"), Markdown("**bold** and `code`"), Emoji("smile")]),
+        )
+        for index in range(count)
+    ]
+
+
+def measure(name: str, count: int, dump, load, buffer: io.IOBase) -> None:
+    data = events(count)
+    start = time.perf_counter()
+    dump(data, buffer)
+    dumped = time.perf_counter() - start
+    size = buffer.tell()
+    buffer.seek(0)
+    start = time.perf_counter()
+    loaded = sum(1 for _ in load(buffer))
+    elapsed = time.perf_counter() - start
+    assert loaded == count
+    print(
+        f"{name:>6}: dump {count / dumped:,.0f} msg/s, load {count / elapsed:,.0f} msg/s, "
+        f"{size / 1024 / 1024:.1f} MiB ({size / count:.0f} bytes/message)"
+    )
+
+
+def main(count: int = 100_000):
+    measure("jsonl", count, dump_jsonl, load_jsonl, io.StringIO())
+    measure("binary", count, dump_stream, load_stream, io.BytesIO())
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
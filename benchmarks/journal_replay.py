@@ -0,0 +1,75 @@
+"""聊天记录日志的恢复耗时
+
+通过带日志的 MessageStorage 写入 N 条消息 (默认 1M, 分布在 20 个频道), 然后测量
+新建存储并重放日志所需的时间. 分别测量默认的快照间隔, 以及关闭快照时完整重放
+N 条记录的情况.
+
+    python benchmarks/journal_replay.py [操作数]
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+from datetime import datetime
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from nonechat.backend.storage import MessageStorage
+from nonechat.model import User, Channel, MessageEvent
+from nonechat.message import Text, Markdown, ConsoleMessage
+from nonechat.backend.journal import SNAPSHOT_INTERVAL, ChatJournal
+
+
+def build(path: Path, count: int, snapshot_interval: int) -> float:
+    storage = MessageStorage()
+    journal = ChatJournal(path, snapshot_interval)
+    journal.replay(storage)
+    storage.journal = journal
+    user = User("u1")
+    channels = [Channel(f"c{index}", f"channel {index}") for index in range(20)]
+    storage.add_user(user)
+    for channel in channels:
+        storage.add_channel(channel)
+    start = time.perf_counter()
+    for index in range(count):
+        channel = channels[index % len(channels)]
+        event = MessageEvent(
+            datetime.now(),
+            "robot",
+            "console.message",
+            user,
+            channel,
+            f"id{index}",
+            ConsoleMessage([Text(f"message {index}"), Markdown("**bold**")]),
+        )
+        storage.write_chat(event, channel)
+    journal.close()
+    return time.perf_counter() - start
+
+
+def replay(path: Path, snapshot_interval: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    storage = MessageStorage()
+    journal = ChatJournal(path, snapshot_interval)
+    journal.replay(storage)
+    elapsed = time.perf_counter() - start
+    journal.close()
+    return elapsed, sum(len(history) for history in storage._chat_history.values())
+
+
+def main(count: int = 1_000_000):
+    for name, interval in (("snapshot", SNAPSHOT_INTERVAL), ("raw", count * 2)):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory)
+            written = build(path, count, interval)
+            size = sum(file.stat().st_size for file in path.iterdir()) / 1024 / 1024
+            elapsed, messages = replay(path, interval)
+            print(
+                f"{name:>8}: {count} writes in {written:.1f} s, {size:.1f} MiB on disk, "
+                f"replayed {messages} messages in {elapsed:.2f} s"
+            )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,72 @@
+"""FakeIO 多线程压力测试
+
+多个线程同时分段写入日志行 (每行拆成多次 write), 检查所有行都完整地按各线程的
+顺序写入 LogStorage, 没有行被截断或交错. 任一检查失败时以非零状态退出.
+
+    python benchmarks/log_stress.py [线程数] [每个线程的行数]
+"""
+
+import re
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from nonechat.log_redirect import FakeIO, LogStorage
+
+LINE = re.compile(r"t(\d+)-(\d+)\n")
+
+
+async def run(threads: int, lines: int) -> int:
+    storage = LogStorage(threads * lines)
+    fake_io = FakeIO(storage)
+    fake_io.attach(asyncio.get_running_loop())
+
+    def worker(index: int):
+        for line in range(lines):
+            fake_io.write(f"t{index}-")
+            fake_io.write(str(line))
+            fake_io.write("\n")
+            fake_io.flush()
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    while any(thread.is_alive() for thread in workers):
+        await asyncio.sleep(0.01)
+    fake_io.detach()
+    elapsed = time.perf_counter() - start
+
+    errors = 0
+    expected = [0] * threads
+    for entry in storage.log_history:
+        match = LINE.fullmatch(str(entry))
+        if match is None:
+            print(f"malformed line: {entry!r}")
+            errors += 1
+            continue
+        index, line = map(int, match.groups())
+        if line != expected[index]:
+            print(f"thread {index}: expected line {expected[index]}, got {line}")
+            errors += 1
+        expected[index] = line + 1
+    missing = sum(lines - count for count in expected)
+    if missing:
+        print(f"{missing} lines missing")
+        errors += 1
+    print(f"{threads} threads x {lines} lines: {len(storage.log_history)} lines in {elapsed:.2f} s")
+    return errors
+
+
+def main(threads: int = 8, lines: int = 2000):
+    if asyncio.run(run(threads, lines)):
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
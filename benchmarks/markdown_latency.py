@@ -0,0 +1,90 @@
+"""发送大型 Markdown 消息后的输入延迟
+
+关闭消息折叠, 分别在同步渲染与后台线程渲染下发送约 200 KB 的 Markdown 消息,
+随后连续按键, 记录每次按键到界面处理完成的耗时, 以及期间事件循环的最长停顿.
+
+    python benchmarks/markdown_latency.py
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from nonechat.setting import ConsoleSetting
+from nonechat import Backend, Frontend, Markdown, ConsoleMessage
+
+SECTION = """
+## Section {index}
+
+Some **bold** text, some *italic* text and `inline code`.
+
+- item one
+- item two
+- item three
+
+```python
+def hello_{index}():
+    return "world"
+```
+
+| a | b | c |
+|---|---|---|
+| 1 | 2 | 3 |
+"""
+
+
+class BenchBackend(Backend):
+    def on_console_load(self): ...
+
+    async def on_console_mount(self): ...
+
+    async def on_console_unmount(self): ...
+
+    async def post_event(self, event): ...
+
+
+async def _watch_loop(stalls: list[float], interval: float = 0.005):
+    last = time.perf_counter()
+    while True:
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        stalls.append(now - last - interval)
+        last = now
+
+
+async def run(threshold: int, markup: str, presses: int = 10) -> tuple[list[float], float]:
+    setting = ConsoleSetting(
+        markdown_thread_threshold=threshold, message_fold_lines=10**9, message_fold_chars=10**9
+    )
+    app = Frontend(BenchBackend, setting)
+    async with app.run_test(size=(160, 50)) as pilot:
+        await pilot.pause()
+        stalls: list[float] = []
+        watcher = asyncio.create_task(_watch_loop(stalls))
+        await app.send_message(ConsoleMessage([Markdown(markup)]))
+        latencies = []
+        for _ in range(presses):
+            start = time.perf_counter()
+            await pilot.press("a")
+            latencies.append(time.perf_counter() - start)
+        await app.workers.wait_for_complete()
+        watcher.cancel()
+    return latencies, max(stalls, default=0.0)
+
+
+def main():
+    markup = "".join(SECTION.format(index=index) for index in range(1000))
+    print(f"markdown size: {len(markup) / 1024:.0f} KB")
+    for name, threshold in (("sync", 10**9), ("thread", ConsoleSetting.markdown_thread_threshold)):
+        latencies, stall = asyncio.run(run(threshold, markup))
+        print(
+            f"{name:>6}: first key {latencies[0] * 1000:.0f} ms, "
+            f"max key {max(latencies) * 1000:.0f} ms, max loop stall {stall * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
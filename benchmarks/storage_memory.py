@@ -0,0 +1,45 @@
+"""MessageStorage 中每条消息的内存占用
+
+向同一频道写入 100k 条文本消息 (临时取消保留数量限制), 每条消息都使用新建的
+User 与 Channel 对象, 与适配器的实际行为一致, 用 tracemalloc 统计平均占用.
+
+    python benchmarks/storage_memory.py [消息数]
+"""
+
+import sys
+import tracemalloc
+from pathlib import Path
+from datetime import datetime
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from nonechat.backend import storage
+from nonechat.message import Text, ConsoleMessage
+from nonechat.model import User, Channel, MessageEvent
+
+
+def main(count: int = 100_000):
+    storage.MAX_MSG_RECORDS = count
+    store = storage.MessageStorage()
+    channel = Channel("c1", "channel")
+    store.add_user(User("u1"))
+    store.add_channel(channel)
+    tracemalloc.start()
+    for index in range(count):
+        event = MessageEvent(
+            datetime.now(),
+            "bot",
+            "console.message",
+            User("u1"),
+            Channel("c1", "channel"),
+            f"m{index}",
+            ConsoleMessage([Text("hello")]),
+        )
+        store.write_chat(event, channel)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{count} messages: {current / count:.0f} bytes/message, peak {peak / 1024 / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
@@ -23,7 +23,7 @@ class ExampleBackend(Backend):
     def on_console_load(self):
         print("on_console_load")
         logger.remove()
-        self._logger_id = logger.add(self.frontend._fake_output, level=0, diagnose=False)
+        self._logger_id = logger.add(self.frontend.log_sink, level=0, diagnose=False)
 
     async def on_console_mount(self):
         logger.info("on_console_mount")
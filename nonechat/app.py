@@ -1,4 +1,5 @@
 import sys
+import asyncio
 import contextlib
 from datetime import datetime
 from typing_extensions import TypeVar
@@ -9,20 +10,36 @@ from textual.widget import Widget
 from textual.widgets import Input
 from textual.binding import Binding
 from textual.message import Message
+from textual.notifications import Notify, Notification, SeverityLevel
 
 from .backend import Backend
 from .router import RouterView
+from .log_journal import LogJournal
 from .setting import ConsoleSetting
 from .views.log_view import LogView
 from .components.footer import Footer
 from .components.header import Header
 from .message import Text, ConsoleMessage
-from .log_redirect import FakeIO, LogStorage
 from .views.horizontal import HorizontalView
-from .model import Event, Robot, Channel, MessageEvent
+from .views.activity_view import ActivityView
+from .model import User, Event, Robot, Channel, MessageEvent
+from .log_redirect import FakeIO, LogStorage, LoguruSink, LoggingHandler
 
 TB = TypeVar("TB", bound=Backend, default=Backend)
 
+# 超出提示数上限的频道共用的提示
+OVERFLOW_TOAST = ""
+
+
+class MessageToast:
+    """一条合并的新消息提示"""
+
+    __slots__ = ("notification", "count")
+
+    def __init__(self, notification: Notification):
+        self.notification = notification
+        self.count = 1
+
 
 class BotModeChanged(Message):
     def __init__(self, is_bot_mode: bool) -> None:
@@ -39,7 +56,11 @@ class Frontend(App, Generic[TB]):
         Binding("ctrl+b", "toggle_bot_mode", "Toggle bot mode", key_display="ctrl+b"),
     ]
 
-    ROUTES = {"main": lambda: HorizontalView(), "log": lambda: LogView()}
+    ROUTES = {
+        "main": lambda: HorizontalView(),
+        "log": lambda: LogView(),
+        "activity": lambda: ActivityView(),
+    }
 
     def __init__(self, backend: type[TB], setting: ConsoleSetting = ConsoleSetting(), bot_mode: bool = False):
         super().__init__()
@@ -47,9 +68,17 @@ class Frontend(App, Generic[TB]):
         self.title = setting.title  # type: ignore
         self.sub_title = setting.sub_title  # type: ignore
 
-        self.log_store = LogStorage()
+        self.log_store = LogStorage(setting.log_capacity)
+        if setting.log_journal_path is not None:
+            self.log_store.journal = LogJournal(
+                setting.log_journal_path, setting.log_journal_segment_size, setting.log_journal_segments
+            )
 
-        self._fake_output = cast(TextIO, FakeIO(self.log_store))
+        self._fake_io = FakeIO(self.log_store)
+        self._fake_output = cast(TextIO, self._fake_io)
+        # 结构化日志入口, 分别用于 loguru 与标准库 logging
+        self.log_sink = LoguruSink(self._fake_io)
+        self.log_handler = LoggingHandler(self._fake_io)
         self._origin_stdout = sys.stdout
         self._origin_stderr = sys.stderr
         self._textual_stdout: Optional[TextIO] = None
@@ -60,6 +89,9 @@ class Frontend(App, Generic[TB]):
         self.is_bot_mode = bot_mode
         self.bot_mode_watchers: list[Widget] = []
 
+        # 各频道当前显示的新消息提示与监视关键词提示
+        self.message_toasts: dict[str, MessageToast] = {}
+
     def compose(self):
         yield Header()
         yield RouterView(self.ROUTES, "main")
@@ -69,6 +101,7 @@ class Frontend(App, Generic[TB]):
         self.backend.on_console_load()
 
     async def on_mount(self):
+        self._fake_io.attach(asyncio.get_running_loop())
         with contextlib.suppress(Exception):
             self._textual_stdout = sys.stdout
             sys.stdout = self._fake_output
@@ -90,6 +123,13 @@ class Frontend(App, Generic[TB]):
             sys.stdout = self._origin_stdout
         if self._textual_stderr is not None:
             sys.stderr = self._origin_stderr
+        self._fake_io.detach()
+        if self.log_store.journal is not None:
+            self.log_store.journal.close()
+        if self.backend.storage.journal is not None:
+            self.backend.storage.journal.close()
+        if self.backend.storage.archive is not None:
+            self.backend.storage.archive.close()
         await self.backend.on_console_unmount()
 
     async def send_message(
@@ -105,11 +145,7 @@ class Frontend(App, Generic[TB]):
             and target.id != self.backend.current_channel.id
             and target.id == f"private:{self.backend.current_user.id}"
         ):
-            self.notify(
-                f"Message from {(bot or self.backend.current_bot).nickname}: {content!s}",
-                title="New Message",
-                timeout=1,
-            )
+            self.notify_message(target, bot or self.backend.current_bot, content)
         msg = MessageEvent(
             time=datetime.now(),
             self_id=(bot or self.backend.current_bot).id,
@@ -123,18 +159,69 @@ class Frontend(App, Generic[TB]):
 
     async def receive_message(self, message: "MessageEvent"):
         """接收消息"""
+        if self.backend.is_duplicate(message, message.channel):
+            return await self.backend.write_chat(message, message.channel)
         if (
             message.channel.id != self.backend.current_channel.id
             and message.channel.id == f"private:{self.backend.current_user.id}"
         ):
-            self.notify(
-                f"Message from {self.backend.current_bot.nickname}: {message.message!s}",
-                title="New Message",
-            )
+            self.notify_message(message.channel, message.user, message.message)
         await self.backend.add_user(message.user)
         await self.backend.add_channel(message.channel)
         return await self.backend.write_chat(message, message.channel)
 
+    def notify_message(self, channel: Channel, sender: User, content: ConsoleMessage) -> None:
+        """提示收到新消息
+
+        显示时长内同一频道的新消息只更新已有提示中的计数, 不会创建新的提示.
+        """
+        self._notify_coalesced(
+            channel.id,
+            f"Message from {sender.nickname}: {content!s}",
+            f"new messages from {sender.nickname}",
+            "New Message",
+        )
+
+    def notify_watch(self, message: MessageEvent, text: str, patterns: tuple[str, ...]) -> None:
+        """提示命中监视关键词的消息, 与新消息提示一样按频道合并并受提示数上限约束"""
+        self._notify_coalesced(
+            f"watch:{message.channel.id}",
+            f"{message.user.nickname} in {message.channel.name}: {text}",
+            f"messages in {message.channel.name} matched watched keywords",
+            f"Watch: {', '.join(patterns)}",
+            "warning",
+        )
+
+    def _notify_coalesced(
+        self, key: str, message: str, summary: str, title: str, severity: SeverityLevel = "information"
+    ) -> None:
+        # 同一 key 的提示合并计数, summary 为合并后计数之后的说明
+        self.message_toasts = {
+            name: toast for name, toast in self.message_toasts.items() if not toast.notification.has_expired
+        }
+        if key not in self.message_toasts and len(self.message_toasts) >= self.setting.notify_max_toasts:
+            key = OVERFLOW_TOAST
+        toast = self.message_toasts.get(key)
+        if toast is None:
+            if key == OVERFLOW_TOAST:
+                message, title, severity = "1 new message in other channels", "New Message", "information"
+            notification = Notification(message, title, severity, timeout=self.setting.notify_window)
+            self.message_toasts[key] = MessageToast(notification)
+            self.post_message(Notify(notification))
+            return
+        toast.count += 1
+        toast.notification.message = (
+            f"{toast.count} {summary}"
+            if key != OVERFLOW_TOAST
+            else f"{toast.count} new messages in other channels"
+        )
+        # 提示的内容在渲染时读取, 只需重绘对应的提示; 计数变化可能改变行数, 需要重新布局
+        with contextlib.suppress(Exception):
+            for widget in self.screen.query("Toast"):
+                if getattr(widget, "_notification", None) is toast.notification:
+                    widget.refresh(layout=True)
+                    break
+
     async def recall_message(self, message_id: str, channel: Union[Channel, None] = None):
         """撤回消息"""
         channel = channel or self.backend.current_channel
@@ -152,7 +239,7 @@ class Frontend(App, Generic[TB]):
 
     def action_focus_input(self):
         with contextlib.suppress(Exception):
-            self.query_one(Input).focus()
+            self.query_one("InputBox > Input", Input).focus()
 
     async def action_post_message(self, message: str):
         msg = MessageEvent(
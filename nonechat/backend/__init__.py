@@ -1,16 +1,26 @@
+from itertools import chain
+from datetime import datetime
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any, Union, Optional
+from collections.abc import Callable, Iterator
+from typing import TYPE_CHECKING, Any, Union, TextIO, Optional
 
 from textual.widget import Widget
 from textual.message import Message
 
+from .journal import ChatJournal
+from .archive import HistoryArchive
 from .storage import MessageStorage
 from ..message import ConsoleMessage
+from .dedup import MessageDeduplicator
+from .watch import WatchList, WatchMatch
+from .export import ExportFormat, write_export
 from ..model import DIRECT, User, Event, Robot, Channel, StateChange, MessageEvent
 
 if TYPE_CHECKING:
     from ..app import Frontend
 
+TIMELINE_PAGE_SIZE = 50
+
 
 class BotAdd(Message, bubble=False):
     def __init__(self, bot: User) -> None:
@@ -57,10 +67,30 @@ class Backend(ABC):
             self.frontend.setting.bot_name,
         )
         self.storage = MessageStorage()
+        if self.frontend.setting.chat_journal_path is not None:
+            journal = ChatJournal(
+                self.frontend.setting.chat_journal_path, self.frontend.setting.chat_journal_snapshot_interval
+            )
+            journal.replay(self.storage)
+            self.storage.journal = journal
+        if self.frontend.setting.history_archive_path is not None:
+            self.storage.archive = HistoryArchive(
+                self.frontend.setting.history_archive_path, self.frontend.setting.history_archive_compression
+            )
+        # 已存储的消息视为已投递, 避免重启后重复写入
+        self.dedup = MessageDeduplicator(self.frontend.setting.dedup_capacity)
+        for channel_id, history in self.storage._chat_history.items():
+            for message_id in history:
+                self.dedup.add(channel_id, message_id)
         self.current_user = User(
             "console", self.frontend.setting.user_avatar, self.frontend.setting.user_name
         )
         self.current_channel = Channel("general", "通用", "默认聊天频道", "💬")
+        self.watch_list = WatchList(self.frontend.setting.watch_keywords)
+        if self.frontend.setting.watch_mentions:
+            self.watch_list.add(f"@{self.current_user.nickname}")
+        # 最近命中监视关键词的消息 ((频道 ID, 消息 ID) -> 命中的关键词)
+        self.watch_hits: dict[tuple[str, str], tuple[str, ...]] = {}
         self.chat_watchers: list[Widget] = []
         self.user_watchers: list[Widget] = []
         self.channel_wathers: list[Widget] = []
@@ -90,23 +120,49 @@ class Backend(ABC):
         return list(self.storage.users.values())
 
     async def list_channels(self, list_users: bool = False) -> list[Channel]:
-        data = list(self.storage.channels.values())
-        data.pop(0)
-        users = [await self.create_dm(self.current_user)]
-        if list_users:
-            users += [
-                await self.create_dm(user)
-                for user in self.storage.users.values()
-                if user.id != self.current_user.id
-            ]
-        users.sort(key=lambda x: x._created_at.timestamp(), reverse=True)
-        return users + data
+        """按最近活动时间从新到旧列出频道"""
+        data = []
+        for channel_id in self.storage.recent_channels():
+            if channel_id.startswith("private:"):
+                user_id = channel_id[8:]
+                if user_id == self.current_user.id:
+                    data.append(await self.create_dm(self.current_user))
+                elif list_users and user_id in self.storage.users:
+                    data.append(await self.create_dm(self.storage.users[user_id]))
+            elif channel_id != DIRECT.id and channel_id in self.storage.channels:
+                data.append(self.storage.channels[channel_id])
+        if f"private:{self.current_user.id}" not in self.storage.activity:
+            data.append(await self.create_dm(self.current_user))
+        return data
 
     async def create_dm(self, user: User):
-        chl = Channel(f"private:{user.id}", user.nickname, "", user.avatar)
-        chl._created_at = user._created_at
+        chl = self.storage.direct_channels.get(f"private:{user.id}")
+        # 用户的昵称或头像变化后需要重新生成私聊频道
+        if chl is None or chl.name != user.nickname or chl.avatar != user.avatar:
+            chl = Channel(f"private:{user.id}", user.nickname, "", user.avatar)
+            chl._created_at = user._created_at
+            self.storage.direct_channels[chl.id] = chl
         return chl
 
+    async def get_last_activity(self, channel: Channel) -> float:
+        """获取频道最近活动的时间戳"""
+        return self.storage.activity.get(channel.id, channel._created_at.timestamp())
+
+    async def get_unread_count(self, channel: Channel) -> int:
+        """获取频道的未读消息数"""
+        _target = await self.create_dm(self.current_user) if channel.id == DIRECT.id else channel
+        return self.storage.unread.get(_target.id, 0)
+
+    async def get_last_read(self, channel: Channel) -> float:
+        """获取频道最后阅读位置的时间戳"""
+        _target = await self.create_dm(self.current_user) if channel.id == DIRECT.id else channel
+        return self.storage.last_read.get(_target.id, 0.0)
+
+    async def mark_read(self, channel: Channel) -> None:
+        """将频道标记为已读"""
+        _target = await self.create_dm(self.current_user) if channel.id == DIRECT.id else channel
+        self.storage.mark_read(_target.id)
+
     async def list_bots(self) -> list[User]:
         return list(self.storage.bots.values())
 
@@ -118,6 +174,76 @@ class Backend(ABC):
         )
         return self.storage.chat_history(_target)
 
+    async def get_timeline(
+        self, before: Optional[datetime] = None, limit: int = TIMELINE_PAGE_SIZE
+    ) -> list[MessageEvent]:
+        """获取所有频道合并后早于 before 的最近一页消息, 按时间从旧到新排列
+
+        与该页最早消息时间相同的消息会一并返回, 下一页以该页最早消息的时间作为 before 即可.
+        """
+        page: list[MessageEvent] = []
+        for event in self.storage.timeline(None if before is None else before.timestamp()):
+            if len(page) >= limit and event.time.timestamp() != page[-1].time.timestamp():
+                break
+            page.append(event)
+        page.reverse()
+        return page
+
+    async def get_archived_history(
+        self, channel: Union[Channel, None] = None, before: Optional[int] = None
+    ) -> tuple[Optional[int], list[MessageEvent]]:
+        """读取归档页序号小于 before 的最近一页历史消息, 返回页序号与消息
+
+        未启用历史归档或没有更早的消息时返回 (None, [])
+        """
+        if self.storage.archive is None:
+            return None, []
+        _target = (
+            await self.create_dm(self.current_user)
+            if (channel or self.current_channel).id == DIRECT.id
+            else (channel or self.current_channel)
+        )
+        return self.storage.archive.older(_target.id, before)
+
+    async def export_channel(self, channel: Union[Channel, None], fmt: ExportFormat, fp: TextIO) -> int:
+        """将频道的全部历史记录 (包括归档) 流式写入文件, 返回导出的消息数
+
+        Args:
+            channel (Channel | None): 要导出的频道, 默认为当前频道
+            fmt (str): 导出格式, 可选 text, markdown, jsonl, html
+            fp (TextIO): 写入的文件
+        """
+        _target = (
+            await self.create_dm(self.current_user)
+            if (channel or self.current_channel).id == DIRECT.id
+            else (channel or self.current_channel)
+        )
+        return self.prepare_export(_target, fmt)(fp)
+
+    def prepare_export(self, channel: Channel, fmt: ExportFormat) -> Callable[[TextIO], int]:
+        """记录频道当前的全部历史记录, 返回将其写入文件并返回消息数的函数
+
+        需在事件循环中调用, 频道需已解析 (不能是 DIRECT); 返回的函数可以在线程中调用, 避免导出时阻塞界面.
+        """
+        # 归档按页解码, 热数据按保留上限复制, 内存占用与频道总消息数无关
+        archive = self.storage.archive
+        archived = archive.snapshot(channel.id) if archive is not None else iter(())
+        recent = self.storage.chat_history(channel)
+
+        def export(fp: TextIO) -> int:
+            count = 0
+
+            def events() -> Iterator[MessageEvent]:
+                nonlocal count
+                for event in chain(archived, recent):
+                    count += 1
+                    yield event
+
+            write_export(channel, events(), fmt, fp)
+            return count
+
+        return export
+
     async def get_latest_chat(self, channel: Union[Channel, None] = None) -> Optional[MessageEvent]:
         """获取当前频道的最新聊天消息"""
         history = await self.get_chat_history(channel)
@@ -133,10 +259,17 @@ class Backend(ABC):
         return self.storage.get_chat(message_id, _target)
 
     def set_user(self, user: User):
+        if self.frontend.setting.watch_mentions and user.nickname != self.current_user.nickname:
+            # 提及的关键词跟随当前用户的昵称, 同时配置为监视关键词的除外
+            mention = f"@{self.current_user.nickname}"
+            if mention not in self.frontend.setting.watch_keywords:
+                self.watch_list.remove(mention)
+            self.watch_list.add(f"@{user.nickname}")
         self.current_user = user
 
     def set_channel(self, channel: Channel):
         self.current_channel = channel
+        self.storage.mark_read(channel.id)
 
     def set_bot(self, bot: Robot):
         self.current_bot = bot
@@ -174,8 +307,46 @@ class Backend(ABC):
             for watcher in self.bot_watchers:
                 watcher.post_message(BotAdd(bot))
 
+    def watch(self, *patterns: str) -> None:
+        """添加监视的关键词"""
+        self.watch_list.add(*patterns)
+
+    def unwatch(self, *patterns: str) -> None:
+        """移除监视的关键词"""
+        self.watch_list.remove(*patterns)
+
+    def check_watch(self, message: "MessageEvent") -> list[WatchMatch]:
+        """检查消息是否命中监视的关键词, 命中时记录并发出通知"""
+        # 匹配原始文本, 不解析标记, 避免非法标记导致写入中断
+        text = message.message.plain()
+        matches = self.watch_list.match(text)
+        if not matches:
+            return matches
+        patterns = tuple(dict.fromkeys(match.pattern for match in matches))
+        self.watch_hits[(message.channel.id, message.message_id)] = patterns
+        if len(self.watch_hits) > self.frontend.setting.watch_hits_capacity:
+            del self.watch_hits[next(iter(self.watch_hits))]
+        sender = self.current_bot if self.frontend.is_bot_mode else self.current_user
+        if message.user.id != sender.id:
+            self.frontend.notify_watch(message, text, patterns)
+        return matches
+
+    def is_duplicate(self, message: "MessageEvent", channel: Channel) -> bool:
+        """消息是否为已写入过的重复投递"""
+        return message.message_id != "_unset_" and (channel.id, message.message_id) in self.dedup
+
     async def write_chat(self, message: "MessageEvent", channel: Channel):
+        # 重复投递的消息不写入存储, 也不通知观察者
+        if message.message_id != "_unset_" and self.dedup.check(channel.id, message.message_id):
+            return message.message_id
         msg_id = self.storage.write_chat(message, channel)
+        if msg_id is None:
+            # 被存储丢弃的迟到消息不计入未读, 也不通知观察者
+            return message.message_id
+        self.dedup.add(channel.id, msg_id)
+        self.check_watch(message)
+        if channel.id == self.current_channel.id:
+            self.storage.mark_read(channel.id)
         self.emit_chat_watcher(message)
         return msg_id
 
@@ -0,0 +1,219 @@
+import lzma
+import zlib
+import shutil
+import marshal
+from pathlib import Path
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import field, dataclass
+from collections.abc import Iterable, Iterator
+from typing import Union, BinaryIO, Callable, Optional
+
+from ..utils import slotted
+from ..model import MessageEvent
+from ..codec import dump_event, load_event, timestamp_of
+
+SEGMENT_MESSAGES = 200
+CACHE_SEGMENTS = 8
+
+COMPRESSORS: dict[str, tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "zlib": (zlib.compress, zlib.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+
+def _load_all(file: BinaryIO) -> Iterator[tuple]:
+    """依次读取文件中的 marshal 记录, 遇到不完整的记录时停止"""
+    while True:
+        try:
+            yield marshal.load(file)
+        except (EOFError, ValueError, TypeError):
+            return
+
+
+@slotted
+@dataclass
+class SegmentInfo:
+    """归档分段的索引项"""
+
+    seq: int
+    start: float
+    end: float
+    ids: frozenset[str]
+
+
+@dataclass
+class _ChannelArchive:
+    path: Path
+    segments: list[SegmentInfo] = field(default_factory=list)
+    # 尚未压缩为分段的消息, 同时追加写入 pending 文件
+    pending: list[tuple] = field(default_factory=list)
+    pending_fp: Optional[BinaryIO] = None
+
+    @property
+    def next_seq(self) -> int:
+        return self.segments[-1].seq + 1 if self.segments else 0
+
+
+class HistoryArchive:
+    """冷存储的历史消息
+
+    从 MessageStorage 中淘汰的消息按频道依次写入压缩的分段文件, 每个分段记录时间范围与消息 ID.
+    回看历史时按需解压分段, 最近解压的分段保存在 LRU 缓存中.
+    分段同样使用 marshal 编码, 不适合在不同版本的 Python 之间共享.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        compression: str = "zlib",
+        segment_messages: int = SEGMENT_MESSAGES,
+        cache_segments: int = CACHE_SEGMENTS,
+    ) -> None:
+        if compression not in COMPRESSORS:
+            raise ValueError(f"Unknown compression: {compression!r}")
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.compress, self.decompress = COMPRESSORS[compression]
+        self.segment_messages = segment_messages
+        self.cache_segments = cache_segments
+        self._channels: dict[str, _ChannelArchive] = {}
+        self._cache: OrderedDict[tuple[str, int], list[MessageEvent]] = OrderedDict()
+
+    def _channel(self, key: str) -> _ChannelArchive:
+        archive = self._channels.get(key)
+        if archive is not None:
+            return archive
+        archive = self._channels[key] = _ChannelArchive(self.path / key.encode().hex())
+        index_file = archive.path / "index"
+        if index_file.exists():
+            with open(index_file, "rb") as file:
+                for seq, start, end, ids in _load_all(file):
+                    archive.segments.append(SegmentInfo(seq, start, end, frozenset(ids)))
+        pending_file = archive.path / "pending"
+        if pending_file.exists():
+            with open(pending_file, "rb") as file:
+                archive.pending.extend(_load_all(file))
+        return archive
+
+    def append(self, key: str, events: Iterable[MessageEvent]) -> None:
+        """归档被淘汰的消息, 消息需按时间顺序传入"""
+        archive = self._channel(key)
+        if archive.pending_fp is None:
+            archive.path.mkdir(exist_ok=True)
+            archive.pending_fp = open(archive.path / "pending", "wb")
+            # 重写 pending 文件, 丢弃异常退出时不完整的末尾记录
+            for data in archive.pending:
+                marshal.dump(data, archive.pending_fp)
+        for event in events:
+            data = dump_event(event)
+            archive.pending.append(data)
+            marshal.dump(data, archive.pending_fp)
+            if len(archive.pending) >= self.segment_messages:
+                self._flush_segment(archive)
+        archive.pending_fp.flush()
+
+    def _flush_segment(self, archive: _ChannelArchive) -> None:
+        if not archive.pending:
+            return
+        info = SegmentInfo(
+            archive.next_seq,
+            timestamp_of(archive.pending[0][0]),
+            timestamp_of(archive.pending[-1][0]),
+            frozenset(data[5] for data in archive.pending),
+        )
+        (archive.path / f"{info.seq:08d}.seg").write_bytes(self.compress(marshal.dumps(archive.pending)))
+        with open(archive.path / "index", "ab") as file:
+            marshal.dump((info.seq, info.start, info.end, tuple(info.ids)), file)
+        archive.segments.append(info)
+        archive.pending.clear()
+        assert archive.pending_fp is not None
+        archive.pending_fp.seek(0)
+        archive.pending_fp.truncate()
+
+    def pages(self, key: str) -> list[int]:
+        """按时间顺序列出频道的归档页序号, 尚未压缩的消息作为最后一页"""
+        archive = self._channel(key)
+        pages = [info.seq for info in archive.segments]
+        if archive.pending:
+            pages.append(archive.next_seq)
+        return pages
+
+    def _read_segment(self, archive: _ChannelArchive, seq: int) -> list[MessageEvent]:
+        file = archive.path / f"{seq:08d}.seg"
+        if not file.exists():
+            return []
+        return [load_event(data) for data in marshal.loads(self.decompress(file.read_bytes()))]
+
+    def load(self, key: str, seq: int) -> list[MessageEvent]:
+        """读取一页归档消息"""
+        archive = self._channel(key)
+        if seq == archive.next_seq:
+            return [load_event(data) for data in archive.pending]
+        cached = self._cache.get((key, seq))
+        if cached is not None:
+            self._cache.move_to_end((key, seq))
+            return cached
+        events = self._read_segment(archive, seq)
+        if not events:
+            return events
+        self._cache[(key, seq)] = events
+        if len(self._cache) > self.cache_segments:
+            self._cache.popitem(last=False)
+        return events
+
+    def snapshot(self, key: str) -> Iterator[MessageEvent]:
+        """按时间顺序读取频道当前的全部归档消息
+
+        调用时记录分段列表与尚未压缩的消息, 因此需在事件循环中调用, 返回的迭代器可以在其他线程中使用.
+        分段逐页解码且不进入 LRU 缓存, 避免挤掉回看历史时缓存的分段.
+        """
+        archive = self._channel(key)
+        segments = [info.seq for info in archive.segments]
+        pending = list(archive.pending)
+
+        def events() -> Iterator[MessageEvent]:
+            for seq in segments:
+                yield from self._cache.get((key, seq)) or self._read_segment(archive, seq)
+            for data in pending:
+                yield load_event(data)
+
+        return events()
+
+    def older(self, key: str, before: Optional[int] = None) -> tuple[Optional[int], list[MessageEvent]]:
+        """读取序号小于 before 的最近一页归档消息, 返回页序号与消息; 没有更早的消息时返回 (None, [])"""
+        pages = self.pages(key)
+        index = len(pages) if before is None else bisect_left(pages, before)
+        if index == 0:
+            return None, []
+        seq = pages[index - 1]
+        return seq, self.load(key, seq)
+
+    def find(self, key: str, message_id: str) -> Optional[MessageEvent]:
+        """按消息 ID 查找已归档的消息"""
+        archive = self._channel(key)
+        for data in archive.pending:
+            if data[5] == message_id:
+                return load_event(data)
+        for info in reversed(archive.segments):
+            if message_id in info.ids:
+                return next(event for event in self.load(key, info.seq) if event.message_id == message_id)
+        return None
+
+    def clear(self, key: str) -> None:
+        """删除频道的全部归档"""
+        archive = self._channel(key)
+        if archive.pending_fp is not None:
+            archive.pending_fp.close()
+        shutil.rmtree(archive.path, ignore_errors=True)
+        del self._channels[key]
+        for cached in [cached for cached in self._cache if cached[0] == key]:
+            del self._cache[cached]
+
+    def close(self) -> None:
+        for archive in self._channels.values():
+            if archive.pending_fp is not None:
+                archive.pending_fp.close()
+                archive.pending_fp = None
+        self._channels.clear()
+        self._cache.clear()
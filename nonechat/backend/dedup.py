@@ -0,0 +1,43 @@
+from collections import Counter, OrderedDict
+
+DEDUP_CAPACITY = 10000
+
+
+class MessageDeduplicator:
+    """按 (频道, 消息 ID) 识别重复投递的消息
+
+    只保留最近 capacity 个消息的标识, 超出后淘汰最久未出现的标识.
+    """
+
+    def __init__(self, capacity: int = DEDUP_CAPACITY) -> None:
+        self.capacity = capacity
+        self._seen: OrderedDict[tuple[str, str], None] = OrderedDict()
+        # 被丢弃的重复消息数
+        self.dropped = 0
+        self.dropped_by_channel: Counter[str] = Counter()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def __contains__(self, key: tuple[str, str]) -> bool:
+        return key in self._seen
+
+    def add(self, channel_id: str, message_id: str) -> None:
+        """记录消息标识"""
+        key = (channel_id, message_id)
+        if key in self._seen:
+            self._seen.move_to_end(key)
+            return
+        self._seen[key] = None
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+
+    def check(self, channel_id: str, message_id: str) -> bool:
+        """若消息已出现过则计为重复并返回 True, 否则记录并返回 False"""
+        if (channel_id, message_id) in self._seen:
+            self._seen.move_to_end((channel_id, message_id))
+            self.dropped += 1
+            self.dropped_by_channel[channel_id] += 1
+            return True
+        self.add(channel_id, message_id)
+        return False
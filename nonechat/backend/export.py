@@ -0,0 +1,73 @@
+from html import escape
+from typing import TextIO, Literal, get_args
+from collections.abc import Iterable, Iterator
+
+from ..codec import to_json, write_chunks
+from ..model import Channel, MessageEvent
+from ..message import Markdown, ConsoleMessage
+
+ExportFormat = Literal["text", "markdown", "jsonl", "html"]
+EXPORT_FORMATS: tuple[str, ...] = get_args(ExportFormat)
+EXPORT_SUFFIXES = {"text": ".txt", "markdown": ".md", "jsonl": ".jsonl", "html": ".html"}
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 960px; margin: 0 auto; padding: 1em; }}
+.message {{ margin: 0.5em 0; }}
+.time {{ color: #888; font-size: 0.85em; }}
+.content {{ white-space: pre-wrap; margin: 0.2em 0 0 1em; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+"""
+HTML_TAIL = "</body>\n</html>\n"
+
+
+def _content(message: ConsoleMessage) -> str:
+    # Markdown 元素保留原始标记, 其源码不一定是合法的 rich 标记; 其余元素输出纯文本
+    return "".join(element.markup if isinstance(element, Markdown) else str(element) for element in message)
+
+
+def _sender(event: MessageEvent) -> str:
+    return f"{event.user.nickname}({event.user.id})"
+
+
+def render_event(event: MessageEvent, fmt: ExportFormat) -> str:
+    """将一条消息转换为导出格式的文本"""
+    if fmt == "jsonl":
+        return f"{to_json(event)}\n"
+    time = event.time.strftime(TIME_FORMAT)
+    if fmt == "markdown":
+        return f"**{_sender(event)}** · {time}\n\n{_content(event.message).rstrip()}\n\n---\n\n"
+    if fmt == "html":
+        return (
+            f'<div class="message"><span class="time">{time}</span> <b>{escape(_sender(event))}</b>'
+            f'<div class="content">{escape(_content(event.message).rstrip())}</div></div>\n'
+        )
+    return f"[{time}] {_sender(event)}: {_content(event.message).rstrip()}\n"
+
+
+def render_export(channel: Channel, events: Iterable[MessageEvent], fmt: ExportFormat) -> Iterator[str]:
+    """逐条生成导出内容"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    if fmt == "markdown":
+        yield f"# {channel.name}\n\n"
+    elif fmt == "html":
+        yield HTML_HEAD.format(title=escape(channel.name))
+    for event in events:
+        yield render_event(event, fmt)
+    if fmt == "html":
+        yield HTML_TAIL
+
+
+def write_export(channel: Channel, events: Iterable[MessageEvent], fmt: ExportFormat, fp: TextIO) -> None:
+    """按块写入导出内容"""
+    write_chunks(fp, render_export(channel, events, fmt), "")
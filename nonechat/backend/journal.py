@@ -0,0 +1,223 @@
+import os
+import zlib
+import struct
+import marshal
+from pathlib import Path
+from collections.abc import Iterable, Iterator
+from typing import Any, Union, BinaryIO, Optional
+
+from ..message import ConsoleMessage
+from .storage import MAX_MSG_RECORDS, MessageStorage
+from ..model import User, Robot, Channel, MessageEvent
+from ..codec import dump_user, load_user, dump_event, load_event, dump_channel, dump_message, load_channel
+
+MAGIC = b"NCJ1"
+SNAPSHOT_INTERVAL = 10000
+BUFFER_SIZE = 1024 * 1024
+
+# 记录头: 负载长度, 负载的 CRC32, 操作类型
+HEADER = struct.Struct("<IIB")
+
+OP_USER = 1
+OP_BOT = 2
+OP_CHANNEL = 3
+OP_WRITE = 4
+OP_EDIT = 5
+OP_REMOVE = 6
+OP_CLEAR = 7
+
+
+def _read_records(path: Path, buffer_size: int = BUFFER_SIZE) -> Iterator[tuple[int, Any, int]]:
+    """顺序读取文件中的完整记录, 产出 (操作类型, 数据, 记录结束位置)
+
+    末尾的记录可能因异常退出而不完整, 读取到第一条损坏的记录时停止.
+    """
+    with open(path, "rb", buffering=buffer_size) as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            return
+        offset = len(MAGIC)
+        read = file.read
+        unpack = HEADER.unpack
+        header_size = HEADER.size
+        while True:
+            header = read(header_size)
+            if len(header) < header_size:
+                return
+            length, crc, op = unpack(header)
+            payload = read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            try:
+                data = marshal.loads(payload)
+            except (EOFError, ValueError, TypeError):
+                return
+            offset += header_size + length
+            yield op, data, offset
+
+
+class ChatJournal:
+    """聊天记录的追加写入日志
+
+    MessageStorage 的每次写入, 编辑, 撤回与清空都会追加为一条二进制记录.
+    每 snapshot_interval 条记录后, 将当前存储状态写入快照并清空日志, 启动时先读取快照再重放日志.
+    记录使用 marshal 编码, 升级 Python 版本后可能无法读取旧的日志.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        snapshot_interval: int = SNAPSHOT_INTERVAL,
+        buffer_size: int = BUFFER_SIZE,
+    ) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.snapshot_interval = snapshot_interval
+        self.buffer_size = buffer_size
+        self.storage: Optional[MessageStorage] = None
+        self._fp: Optional[BinaryIO] = None
+        self._ops = 0
+
+    @property
+    def journal_file(self) -> Path:
+        return self.path / "journal.bin"
+
+    @property
+    def snapshot_file(self) -> Path:
+        return self.path / "snapshot.bin"
+
+    def replay(self, storage: MessageStorage) -> None:
+        """从快照与日志中恢复存储状态, 之后的修改将写入日志"""
+        self._ops = 0
+        end = 0
+
+        def records() -> Iterator[tuple[int, Any]]:
+            nonlocal end
+            if self.snapshot_file.exists():
+                for op, data, _ in _read_records(self.snapshot_file, self.buffer_size):
+                    yield op, data
+            if self.journal_file.exists():
+                for op, data, end in _read_records(self.journal_file, self.buffer_size):
+                    self._ops += 1
+                    yield op, data
+
+        self._apply(storage, records())
+
+        self._fp = open(self.journal_file, "r+b" if end else "wb", buffering=self.buffer_size)
+        if end:
+            # 丢弃不完整的末尾记录
+            self._fp.seek(end)
+            self._fp.truncate()
+        else:
+            self._fp.write(MAGIC)
+            self._fp.flush()
+        self.storage = storage
+
+    def _apply(self, storage: MessageStorage, records: Iterable[tuple[int, Any]]) -> None:
+        # 先以编码形式回放, 只有最终保留的消息才会被解码为对象
+        users: dict[str, tuple] = {}
+        bots: dict[str, tuple] = {}
+        channels: dict[str, tuple] = {}
+        history: dict[str, dict[str, list]] = {}
+        for op, data in records:
+            if op == OP_WRITE:
+                key, event = data
+                messages = history.setdefault(key, {})
+                messages[event[5]] = list(event)
+                if len(messages) > MAX_MSG_RECORDS:
+                    del messages[next(iter(messages))]
+            elif op == OP_EDIT:
+                key, message_id, message = data
+                event = history.get(key, {}).get(message_id)
+                if event is not None:
+                    event[6] = message
+            elif op == OP_REMOVE:
+                key, message_id = data
+                history.get(key, {}).pop(message_id, None)
+            elif op == OP_CLEAR:
+                history.pop(data, None)
+            elif op == OP_USER:
+                users.setdefault(data[1], data)
+            elif op == OP_BOT:
+                bots.setdefault(data[1], data)
+            elif op == OP_CHANNEL:
+                channels.setdefault(data[0], data)
+
+        for data in users.values():
+            storage.add_user(load_user(data))
+        for data in bots.values():
+            storage.add_bot(load_user(data))  # type: ignore
+        for data in channels.values():
+            storage.add_channel(load_channel(data))
+        for key, messages in history.items():
+            for data in messages.values():
+                event = load_event(tuple(data))
+                storage.write_chat(event, event.channel if event.channel.id == key else Channel(key, key))
+        # 恢复的历史记录视为已读
+        storage.unread.clear()
+        storage.last_read.update(storage.activity)
+
+    def _append(self, op: int, data: Any) -> None:
+        if self._fp is None:
+            return
+        payload = marshal.dumps(data)
+        self._fp.write(HEADER.pack(len(payload), zlib.crc32(payload), op))
+        self._fp.write(payload)
+        self._fp.flush()
+        self._ops += 1
+        if self._ops >= self.snapshot_interval:
+            self.snapshot()
+
+    def add_user(self, user: User) -> None:
+        self._append(OP_BOT if isinstance(user, Robot) else OP_USER, dump_user(user))
+
+    def add_channel(self, channel: Channel) -> None:
+        self._append(OP_CHANNEL, dump_channel(channel))
+
+    def write_chat(self, key: str, event: MessageEvent) -> None:
+        self._append(OP_WRITE, (key, dump_event(event)))
+
+    def edit_chat(self, key: str, message_id: str, message: ConsoleMessage) -> None:
+        self._append(OP_EDIT, (key, message_id, dump_message(message)))
+
+    def remove_chat(self, key: str, message_id: str) -> None:
+        self._append(OP_REMOVE, (key, message_id))
+
+    def clear_chat_history(self, key: str) -> None:
+        self._append(OP_CLEAR, key)
+
+    def snapshot(self) -> None:
+        """将当前存储状态写入快照, 并清空日志"""
+        if self.storage is None or self._fp is None:
+            return
+        storage = self.storage
+        temp = self.snapshot_file.with_suffix(".tmp")
+        with open(temp, "wb", buffering=self.buffer_size) as file:
+            file.write(MAGIC)
+
+            def write(op: int, data: Any) -> None:
+                payload = marshal.dumps(data)
+                file.write(HEADER.pack(len(payload), zlib.crc32(payload), op))
+                file.write(payload)
+
+            for user in storage.users.values():
+                write(OP_USER, dump_user(user))
+            for bot in storage.bots.values():
+                write(OP_BOT, dump_user(bot))
+            for channel in storage.channels.values():
+                write(OP_CHANNEL, dump_channel(channel))
+            for key, messages in storage._chat_history.items():
+                for event in messages.values():
+                    write(OP_WRITE, (key, dump_event(event)))
+            file.flush()
+            os.fsync(file.fileno())
+        # 快照替换完成前崩溃时, 旧快照与日志仍然完整; 替换后日志中的记录重放是幂等的
+        os.replace(temp, self.snapshot_file)
+        self._fp.seek(len(MAGIC))
+        self._fp.truncate()
+        self._fp.flush()
+        self._ops = 0
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
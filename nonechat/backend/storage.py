@@ -1,10 +1,18 @@
-from typing import Optional
+import heapq
+from itertools import islice
 from secrets import token_hex
+from collections.abc import Iterator
 from dataclasses import field, dataclass
+from typing import TYPE_CHECKING, Optional
+from bisect import insort, bisect_left, bisect_right
 
 from ..message import ConsoleMessage
 from ..model import DIRECT, User, Robot, Channel, MessageEvent
 
+if TYPE_CHECKING:
+    from .journal import ChatJournal
+    from .archive import HistoryArchive
+
 MAX_MSG_RECORDS = 500
 
 
@@ -14,21 +22,75 @@ class MessageStorage:
     users: dict[str, User] = field(default_factory=dict)
     channels: dict[str, Channel] = field(default_factory=dict)
     bots: dict[str, Robot] = field(default_factory=dict)
+    direct_channels: dict[str, Channel] = field(default_factory=dict)
 
     # 按频道分组的聊天历史记录
     _chat_history: dict[str, dict[str, MessageEvent]] = field(default_factory=dict)
+    # 各频道消息时间戳的有序数组, 与聊天历史中的顺序一致
+    _times: dict[str, list[float]] = field(default_factory=dict)
+
+    # 频道的最近活动时间 (频道 ID -> 时间戳)
+    activity: dict[str, float] = field(default_factory=dict)
+    # 按最近活动时间排序的 (时间戳, 频道 ID), 最近活跃的频道在末尾
+    _activity_order: list[tuple[float, str]] = field(default_factory=list)
+
+    # 频道的未读消息数与最后阅读位置 (时间戳)
+    unread: dict[str, int] = field(default_factory=dict)
+    last_read: dict[str, float] = field(default_factory=dict)
+
+    # 可选的聊天记录日志, 修改会同时追加到其中
+    journal: Optional["ChatJournal"] = None
+    # 可选的历史归档, 超出 MAX_MSG_RECORDS 被淘汰的消息会写入其中
+    archive: Optional["HistoryArchive"] = None
 
     def __post_init__(self):
         self.channels[DIRECT.id] = DIRECT  # 添加默认的 DIRECT 频道
 
+    def touch(self, channel_id: str, timestamp: float):
+        """更新频道的最近活动时间"""
+        last = self.activity.get(channel_id)
+        if last is not None:
+            if timestamp < last:
+                return
+            order = self._activity_order
+            del order[bisect_left(order, (last, channel_id))]
+        self.activity[channel_id] = timestamp
+        insort(self._activity_order, (timestamp, channel_id))
+
+    def recent_channels(self) -> Iterator[str]:
+        """按最近活动时间从新到旧列出频道 ID"""
+        return (channel_id for _, channel_id in reversed(self._activity_order))
+
+    def mark_read(self, channel_id: str):
+        """将频道标记为已读"""
+        self.unread.pop(channel_id, None)
+        self.last_read[channel_id] = self.activity.get(channel_id, 0.0)
+
     def chat_history(self, channel: Channel) -> list[MessageEvent]:
         """获取当前频道的聊天历史"""
         return list(self._chat_history.get(channel.id, {}).values())
 
+    def timeline(self, before: Optional[float] = None) -> Iterator[MessageEvent]:
+        """按时间从新到旧合并所有频道的聊天历史, 只包含早于 before 的消息
+
+        各频道的历史已按时间排序, 因此只需对各频道做多路归并, 按需逐条产出.
+        按时间戳比较, 带时区与不带时区的时间可以混合排序.
+        """
+        streams: list[Iterator[MessageEvent]] = []
+        for key, history in self._chat_history.items():
+            times = self._times.get(key, [])
+            end = len(times) if before is None else bisect_left(times, before)
+            if end:
+                streams.append(islice(reversed(history.values()), len(times) - end, None))
+        return heapq.merge(*streams, key=lambda event: event.time.timestamp(), reverse=True)
+
     def add_user(self, user: User):
         """添加新用户"""
         if user.id not in self.users:
             self.users[user.id] = user
+            self.touch(f"private:{user.id}", user._created_at.timestamp())
+            if self.journal is not None:
+                self.journal.add_user(user)
             return True
         return False
 
@@ -36,6 +98,8 @@ class MessageStorage:
         """添加新机器人"""
         if bot.id not in self.bots:
             self.bots[bot.id] = bot
+            if self.journal is not None:
+                self.journal.add_user(bot)
             return True
         return False
 
@@ -43,10 +107,53 @@ class MessageStorage:
         """添加新频道"""
         if channel.id not in self.channels:
             self.channels[channel.id] = channel
+            self.touch(channel.id, channel._created_at.timestamp())
+            if self.journal is not None:
+                self.journal.add_channel(channel)
             return True
         return False
 
-    def write_chat(self, message: "MessageEvent", channel: Channel) -> str:
+    def intern_user(self, user: User) -> User:
+        """返回与该用户相同的已登记用户对象
+
+        昵称或头像变化时改为登记传入的对象, 之后的消息引用新的对象, 已存储的消息保持原样.
+        """
+        pool = self.bots if isinstance(user, Robot) else self.users
+        known = pool.get(user.id)
+        if known is None:
+            return user
+        if type(known) is type(user) and (known.avatar, known.nickname) == (user.avatar, user.nickname):
+            return known
+        pool[user.id] = user
+        return user
+
+    def intern_channel(self, channel: Channel) -> Channel:
+        """返回与该频道相同的已登记频道对象, 名称, 描述或头像变化时的处理同 intern_user"""
+        if channel.id in self.channels:
+            pool = self.channels
+        elif channel.id.startswith("private:"):
+            pool = self.direct_channels
+        else:
+            return channel
+        known = pool.setdefault(channel.id, channel)
+        if (known.name, known.description, known.avatar) == (
+            channel.name,
+            channel.description,
+            channel.avatar,
+        ):
+            return known
+        pool[channel.id] = channel
+        return channel
+
+    def write_chat(self, message: "MessageEvent", channel: Channel) -> Optional[str]:
+        """写入聊天消息, 返回消息 ID
+
+        历史已满时, 早于全部保留消息的迟到消息会在写入后立即被淘汰, 且无法按时间顺序归档,
+        因此直接丢弃并返回 None.
+        """
+        # 让存储的事件引用同一份用户与频道对象
+        message.user = self.intern_user(message.user)
+        message.channel = self.intern_channel(message.channel)
         key = channel.id
         if key not in self._chat_history:
             self._chat_history[key] = {}
@@ -56,31 +163,86 @@ class MessageStorage:
         else:
             message_id = message.message_id
         current_history = self._chat_history[key]
-        current_history[message_id] = message
+        times = self._times.setdefault(key, [])
+        timestamp = message.time.timestamp()
+        if message_id in current_history:
+            self._uncount(key, self._discard(key, message_id))
+        elif len(current_history) >= MAX_MSG_RECORDS and timestamp < times[0]:
+            return None
+        if not times or timestamp >= times[-1]:
+            times.append(timestamp)
+            current_history[message_id] = message
+        else:
+            # 迟到的消息按时间插入到合适的位置
+            index = bisect_right(times, timestamp)
+            times.insert(index, timestamp)
+            # 只需重排插入位置之后的消息, 越接近末尾开销越小
+            tail = [current_history.popitem() for _ in range(len(times) - 1 - index)]
+            current_history[message_id] = message
+            current_history.update(reversed(tail))
+        if self.journal is not None:
+            self.journal.write_chat(key, message)
+        self.touch(key, timestamp)
+        # 早于最后阅读位置的迟到消息不计入未读
+        if timestamp > self.last_read.get(key, 0.0):
+            self.unread[key] = self.unread.get(key, 0) + 1
         # 限制历史记录数量
         if len(current_history) > MAX_MSG_RECORDS:
-            self._chat_history[key] = dict(list(current_history.items())[-MAX_MSG_RECORDS:])
+            evicted = current_history.pop(next(iter(current_history)))
+            del times[0]
+            self._uncount(key, evicted)
+            if self.archive is not None:
+                self.archive.append(key, (evicted,))
         return message_id
 
+    def _discard(self, key: str, message_id: str) -> Optional[MessageEvent]:
+        message = self._chat_history[key].pop(message_id, None)
+        if message is not None:
+            # 时间相同的项可以互换, 删除任意一个即可保持有序
+            times = self._times[key]
+            del times[bisect_left(times, message.time.timestamp())]
+        return message
+
+    def _uncount(self, key: str, message: Optional[MessageEvent]) -> None:
+        # 移除仍计为未读的消息时扣减未读数
+        if (
+            message is not None
+            and self.unread.get(key)
+            and message.time.timestamp() > self.last_read.get(key, 0.0)
+        ):
+            self.unread[key] -= 1
+
     def remove_chat(self, message_id: str, channel: Channel):
         if channel.id in self._chat_history:
-            self._chat_history[channel.id].pop(message_id, None)
+            message = self._discard(channel.id, message_id)
+            if message and self.journal is not None:
+                self.journal.remove_chat(channel.id, message_id)
+            self._uncount(channel.id, message)
 
     def edit_chat(self, message_id: str, content: ConsoleMessage, channel: Channel):
         """编辑当前频道的聊天消息"""
         if channel.id in self._chat_history:
             current_history = self._chat_history[channel.id]
             if message_id in current_history:
+                content.invalidate()
                 current_history[message_id].message = content
+                if self.journal is not None:
+                    self.journal.edit_chat(channel.id, message_id, content)
                 return True
         return False
 
     def get_chat(self, message_id: str, channel: Channel) -> Optional[MessageEvent]:
         """获取当前频道的聊天消息"""
-        if channel.id in self._chat_history:
-            return self._chat_history[channel.id].get(message_id, None)
-        return None
+        message = self._chat_history.get(channel.id, {}).get(message_id)
+        if message is None and self.archive is not None:
+            return self.archive.find(channel.id, message_id)
+        return message
 
     def clear_chat_history(self, channel: Channel):
         """清空当前频道的聊天历史"""
-        self._chat_history.pop(channel.id, None)
+        self._times.pop(channel.id, None)
+        if self._chat_history.pop(channel.id, None) is not None and self.journal is not None:
+            self.journal.clear_chat_history(channel.id)
+        if self.archive is not None:
+            self.archive.clear(channel.id)
+        self.unread.pop(channel.id, None)
@@ -0,0 +1,111 @@
+from collections import deque
+from typing import Optional, NamedTuple, cast
+from collections.abc import Iterable, Iterator
+
+
+class WatchMatch(NamedTuple):
+    start: int
+    end: int
+    pattern: str
+
+
+def _fold(text: str) -> str:
+    # 忽略大小写, 同时保证折叠后每个字符的位置不变
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(lower if len(lower := char.lower()) == 1 else char for char in text)
+
+
+class WatchList:
+    """关键词监视列表, 忽略大小写
+
+    关键词编译为 Aho-Corasick 自动机, 每条消息只需扫描一遍即可找出全部命中的关键词.
+    增删关键词时直接修改字典树, 失配链接在下一次匹配前统一重建.
+    """
+
+    def __init__(self, patterns: Iterable[str] = ()) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # 以该节点结尾的关键词与最近的带关键词的后缀节点
+        self._output: list[Optional[str]] = [None]
+        self._suffix: list[int] = [0]
+        self._depth: list[int] = [0]
+        self._patterns: dict[str, int] = {}
+        self._dirty = False
+        self.add(*patterns)
+
+    def __len__(self) -> int:
+        return len(self._patterns)
+
+    def __contains__(self, pattern: str) -> bool:
+        return _fold(pattern) in self._patterns
+
+    def __iter__(self) -> Iterator[str]:
+        return (cast(str, self._output[node]) for node in self._patterns.values())
+
+    def add(self, *patterns: str) -> None:
+        """添加关键词"""
+        for pattern in patterns:
+            key = _fold(pattern)
+            if not key or key in self._patterns:
+                continue
+            node = 0
+            for char in key:
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                    self._suffix.append(0)
+                    self._depth.append(self._depth[node] + 1)
+                node = child
+            self._output[node] = pattern
+            self._patterns[key] = node
+            self._dirty = True
+
+    def remove(self, *patterns: str) -> None:
+        """移除关键词, 字典树中的节点会保留以便复用"""
+        for pattern in patterns:
+            node = self._patterns.pop(_fold(pattern), None)
+            if node is not None:
+                self._output[node] = None
+                self._dirty = True
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        for node in queue:
+            self._fail[node] = 0
+            self._suffix[node] = 0
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                self._suffix[child] = fail if self._output[fail] is not None else self._suffix[fail]
+                queue.append(child)
+        self._dirty = False
+
+    def match(self, text: str) -> list[WatchMatch]:
+        """查找文本中出现的全部关键词, 按结束位置排列"""
+        if not self._patterns:
+            return []
+        if self._dirty:
+            self._build()
+        goto, fail, output, suffix, depth = self._goto, self._fail, self._output, self._suffix, self._depth
+        result: list[WatchMatch] = []
+        node = 0
+        for index, char in enumerate(_fold(text)):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            hit = node if output[node] is not None else suffix[node]
+            while hit:
+                result.append(WatchMatch(index + 1 - depth[hit], index + 1, cast(str, output[hit])))
+                hit = suffix[hit]
+        return result
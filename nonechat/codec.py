@@ -0,0 +1,314 @@
+import json
+import struct
+import marshal
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone, timedelta
+from typing import IO, Any, Union, TextIO, BinaryIO
+
+from rich.style import Style
+
+from .model import User, Robot, Channel, MessageEvent
+from .message import Text, Emoji, Markup, Element, Markdown, ConsoleMessage
+
+# 2: 带时区的时间保存 UTC 偏移
+CODEC_VERSION = 2
+MAGIC = b"NCC"
+FRAME = struct.Struct("<I")
+CHUNK_SIZE = 64 * 1024
+
+Serializable = Union[MessageEvent, User, Channel, ConsoleMessage, Element]
+
+# 每种对象有两种形式: 由基本类型组成的紧凑元组, 用于二进制格式与内部持久化;
+# 带字段名的字典, 用于 JSON Lines. 元素类型通过 register_element 登记, 未登记的元素按文本保存.
+# 二进制形式与聊天记录日志, 历史归档都使用 marshal 编码, 其格式可能随 Python 版本变化,
+# 因此这些文件只保证由相同版本的 Python 读取; 跨版本持久化或进程间通信请使用 JSON Lines.
+_ELEMENT_FIELDS: dict[str, tuple[type[Element], tuple[str, ...]]] = {}
+_ELEMENT_TAGS: dict[type[Element], str] = {}
+
+USER_FIELDS = ("is_bot", "id", "avatar", "nickname", "created_at")
+CHANNEL_FIELDS = ("id", "name", "description", "avatar", "created_at")
+EVENT_FIELDS = ("time", "self_id", "type", "user", "channel", "message_id", "message")
+
+
+def register_element(tag: str, cls: type[Element], fields: tuple[str, ...]) -> None:
+    """登记元素类型
+
+    Args:
+        tag (str): 序列化时使用的类型名
+        cls (type[Element]): 元素类型, 需可以按 fields 的顺序以位置参数构造
+        fields (tuple[str, ...]): 需要保存的属性名
+    """
+    _ELEMENT_FIELDS[tag] = (cls, fields)
+    _ELEMENT_TAGS[cls] = tag
+
+
+register_element("text", Text, ("text",))
+register_element("emoji", Emoji, ("name",))
+register_element("markup", Markup, ("markup", "style", "emoji", "emoji_variant"))
+register_element(
+    "markdown",
+    Markdown,
+    ("markup", "code_theme", "justify", "style", "hyperlinks", "inline_code_lexer", "inline_code_theme"),
+)
+
+
+def dump_time(time: datetime) -> Union[float, tuple[float, float]]:
+    """不带时区的时间保存为本地时间戳, 带时区的时间同时保存 UTC 偏移 (秒)"""
+    offset = time.utcoffset()
+    if offset is None:
+        return time.timestamp()
+    return (time.timestamp(), offset.total_seconds())
+
+
+def load_time(data: Any) -> datetime:
+    if isinstance(data, (int, float)):
+        return datetime.fromtimestamp(data)
+    timestamp, offset = data
+    return datetime.fromtimestamp(timestamp, timezone(timedelta(seconds=offset)))
+
+
+def timestamp_of(data: Any) -> float:
+    """从紧凑形式的时间中取出时间戳"""
+    return data if isinstance(data, (int, float)) else data[0]
+
+
+def _value(value: Any) -> Any:
+    return str(value) if isinstance(value, Style) else value
+
+
+def dump_element(element: Element) -> tuple:
+    tag = _ELEMENT_TAGS.get(type(element))
+    if tag is None:
+        return ("text", str(element))
+    return (tag, *(_value(getattr(element, name)) for name in _ELEMENT_FIELDS[tag][1]))
+
+
+def load_element(data: tuple) -> Element:
+    tag, *args = data
+    cls, _ = _ELEMENT_FIELDS.get(tag, (Text, ()))
+    return cls(*args)
+
+
+def dump_message(message: ConsoleMessage) -> tuple:
+    return tuple(dump_element(element) for element in message)
+
+
+def load_message(data: Iterable[tuple]) -> ConsoleMessage:
+    return ConsoleMessage([load_element(element) for element in data])
+
+
+def dump_user(user: User) -> tuple:
+    return (isinstance(user, Robot), user.id, user.avatar, user.nickname, dump_time(user._created_at))
+
+
+def load_user(data: tuple) -> User:
+    is_bot, user_id, avatar, nickname, created = data
+    user = (Robot if is_bot else User)(user_id, avatar, nickname)
+    user._created_at = load_time(created)
+    return user
+
+
+def dump_channel(channel: Channel) -> tuple:
+    return (channel.id, channel.name, channel.description, channel.avatar, dump_time(channel._created_at))
+
+
+def load_channel(data: tuple) -> Channel:
+    channel_id, name, description, avatar, created = data
+    channel = Channel(channel_id, name, description, avatar)
+    channel._created_at = load_time(created)
+    return channel
+
+
+def dump_event(event: MessageEvent) -> tuple:
+    return (
+        dump_time(event.time),
+        event.self_id,
+        event.type,
+        dump_user(event.user),
+        dump_channel(event.channel),
+        event.message_id,
+        dump_message(event.message),
+    )
+
+
+def load_event(data: tuple) -> MessageEvent:
+    time, self_id, type_, user, channel, message_id, message = data
+    return MessageEvent(
+        load_time(time),
+        self_id,
+        type_,
+        load_user(user),
+        load_channel(channel),
+        message_id,
+        load_message(message),
+    )
+
+
+def dump(obj: Serializable) -> tuple[str, tuple]:
+    """将对象转换为 (类型名, 紧凑形式)"""
+    if isinstance(obj, MessageEvent):
+        return "event", dump_event(obj)
+    if isinstance(obj, User):
+        return "user", dump_user(obj)
+    if isinstance(obj, Channel):
+        return "channel", dump_channel(obj)
+    if isinstance(obj, ConsoleMessage):
+        return "message", dump_message(obj)
+    if isinstance(obj, Element):
+        return "element", dump_element(obj)
+    raise TypeError(f"Cannot serialize object of type {type(obj).__name__}")
+
+
+_LOADERS = {
+    "event": load_event,
+    "user": load_user,
+    "channel": load_channel,
+    "message": load_message,
+    "element": load_element,
+}
+
+
+def load(kind: str, data: Any) -> Serializable:
+    """从 (类型名, 紧凑形式) 还原对象"""
+    loader = _LOADERS.get(kind)
+    if loader is None:
+        raise ValueError(f"Unknown object kind: {kind!r}")
+    return loader(data)
+
+
+def _element_to_dict(data: tuple) -> dict[str, Any]:
+    tag, *args = data
+    return {"type": tag, **dict(zip(_ELEMENT_FIELDS[tag][1], args))}
+
+
+def _element_from_dict(data: dict[str, Any]) -> tuple:
+    tag = data["type"]
+    return (tag, *(data.get(name) for name in _ELEMENT_FIELDS.get(tag, (Text, ("text",)))[1]))
+
+
+def _to_dict(kind: str, data: Any) -> Any:
+    if kind == "element":
+        return _element_to_dict(data)
+    if kind == "message":
+        return [_element_to_dict(element) for element in data]
+    if kind == "user":
+        return dict(zip(USER_FIELDS, data))
+    if kind == "channel":
+        return dict(zip(CHANNEL_FIELDS, data))
+    if kind == "event":
+        result = dict(zip(EVENT_FIELDS, data))
+        result["user"] = _to_dict("user", result["user"])
+        result["channel"] = _to_dict("channel", result["channel"])
+        result["message"] = _to_dict("message", result["message"])
+        return result
+    raise ValueError(f"Unknown object kind: {kind!r}")
+
+
+def _from_dict(kind: str, data: Any) -> Any:
+    if kind == "element":
+        return _element_from_dict(data)
+    if kind == "message":
+        return tuple(_element_from_dict(element) for element in data)
+    if kind == "user":
+        return tuple(data[name] for name in USER_FIELDS)
+    if kind == "channel":
+        return tuple(data[name] for name in CHANNEL_FIELDS)
+    if kind == "event":
+        return (
+            data["time"],
+            data["self_id"],
+            data["type"],
+            _from_dict("user", data["user"]),
+            _from_dict("channel", data["channel"]),
+            data["message_id"],
+            _from_dict("message", data["message"]),
+        )
+    raise ValueError(f"Unknown object kind: {kind!r}")
+
+
+def _check_version(version: int) -> None:
+    if version > CODEC_VERSION:
+        raise ValueError(f"Unsupported codec version: {version}")
+
+
+def to_json(obj: Serializable) -> str:
+    """序列化为一行 JSON"""
+    kind, data = dump(obj)
+    return json.dumps({"v": CODEC_VERSION, "kind": kind, "data": _to_dict(kind, data)}, ensure_ascii=False)
+
+
+def from_json(line: Union[str, bytes]) -> Serializable:
+    value = json.loads(line)
+    _check_version(value["v"])
+    return load(value["kind"], _from_dict(value["kind"], value["data"]))
+
+
+def to_bytes(obj: Serializable) -> bytes:
+    """序列化为紧凑的二进制形式, 只保证由相同版本的 Python 读取"""
+    return MAGIC + bytes((CODEC_VERSION,)) + marshal.dumps(dump(obj))
+
+
+def from_bytes(data: bytes) -> Serializable:
+    if data[:3] != MAGIC:
+        raise ValueError("Invalid codec header")
+    _check_version(data[3])
+    return load(*marshal.loads(data[4:]))
+
+
+def write_chunks(fp: IO[Any], parts: Iterable[Any], empty: Any) -> int:
+    """按块写入, 减少写入调用次数, 返回写入的对象数"""
+    chunk: list[Any] = []
+    size = 0
+    count = 0
+    for part in parts:
+        chunk.append(part)
+        size += len(part)
+        count += 1
+        if size >= CHUNK_SIZE:
+            fp.write(empty.join(chunk))
+            chunk.clear()
+            size = 0
+    if chunk:
+        fp.write(empty.join(chunk))
+    return count
+
+
+def dump_jsonl(objects: Iterable[Serializable], fp: TextIO) -> int:
+    """将对象逐行写入 JSON Lines 文件, 返回写入的对象数"""
+    return write_chunks(fp, (f"{to_json(obj)}\n" for obj in objects), "")
+
+
+def load_jsonl(fp: Iterable[Union[str, bytes]]) -> Iterator[Serializable]:
+    """逐行读取 JSON Lines 文件, 跳过空行"""
+    for line in fp:
+        if line.strip():
+            yield from_json(line)
+
+
+def dump_stream(objects: Iterable[Serializable], fp: BinaryIO) -> int:
+    """将对象写入二进制流, 返回写入的对象数"""
+    fp.write(MAGIC + bytes((CODEC_VERSION,)))
+
+    def frames() -> Iterator[bytes]:
+        for obj in objects:
+            payload = marshal.dumps(dump(obj))
+            yield FRAME.pack(len(payload)) + payload
+
+    return write_chunks(fp, frames(), b"")
+
+
+def load_stream(fp: BinaryIO) -> Iterator[Serializable]:
+    """从二进制流中逐个读取对象, 流末尾不完整的对象将被忽略"""
+    header = fp.read(4)
+    if header[:3] != MAGIC:
+        raise ValueError("Invalid codec header")
+    _check_version(header[3])
+    while True:
+        frame = fp.read(FRAME.size)
+        if len(frame) < FRAME.size:
+            return
+        (length,) = FRAME.unpack(frame)
+        payload = fp.read(length)
+        if len(payload) < length:
+            return
+        yield load(*marshal.loads(payload))
@@ -1,16 +1,17 @@
 import random
 import string
-from datetime import datetime
 from typing import TYPE_CHECKING, Optional, cast
 
+from rich.markup import escape
 from textual.widget import Widget
 from textual.message import Message
-from textual.widgets import Label, ListItem, ListView
 
+from .virtual_list import VirtualList
 from ..model import DIRECT, User, Channel, StateChange, MessageEvent
 
 if TYPE_CHECKING:
     from ..app import Frontend, BotModeChanged
+    from ..backend import ChannelAdd, MessageDeleted
 
 
 class ChannelSelectorPressed(Message):
@@ -25,7 +26,6 @@ class ChannelSelectorPressed(Message):
 class _store:
     """存储当前用户的状态"""
 
-    check_record: dict[str, float] = {}  # 用于记录频道的最后活动时间
     current_channel: Channel = DIRECT  # 默认频道为 DIRECT
 
 
@@ -40,21 +40,16 @@ class ChannelSelector(Widget):
         padding: 0 1;
     }
 
-    ChannelSelector ListView {
+    ChannelSelector VirtualList {
         height: 1fr;
         width: 100%;
     }
-
-    ChannelSelector ListItem {
-        width: 100%;
-        margin: 1;
-        text-align: center;
-    }
     """
 
     def __init__(self):
         super().__init__()
-        self.channel_items: dict[str, tuple[ListItem, tuple[Channel, Optional[User]]]] = {}
+        self.channel_items: dict[str, tuple[Channel, Optional[User]]] = {}
+        self.channel_times: dict[str, float] = {}
         self.is_bot_mode = self.app.is_bot_mode
 
     @property
@@ -62,7 +57,7 @@ class ChannelSelector(Widget):
         return cast("Frontend", super().app)
 
     def compose(self):
-        yield ListView(id="channel-list")
+        yield VirtualList(id="channel-list")
 
     async def on_mount(self):
         _store.current_channel = self.app.backend.current_channel
@@ -77,10 +72,14 @@ class ChannelSelector(Widget):
         self.app.backend.remove_chat_watcher(self)
 
     async def on_state_change(self, event: "StateChange[tuple[MessageEvent, ...]]"):
-        await self.update_channel_list()
+        for message in event.data:
+            await self.update_channel(message.channel)
 
-    async def on_channel_add(self, event):
-        await self.update_channel_list()
+    async def on_channel_add(self, event: "ChannelAdd"):
+        await self.update_channel(event.channel)
+
+    async def on_message_deleted(self, event: "MessageDeleted"):
+        await self.update_channel(event.channel)
 
     async def on_bot_mode_changed(self, event: "BotModeChanged"):
         """处理模式切换"""
@@ -88,89 +87,96 @@ class ChannelSelector(Widget):
         await self.update_channel_list()
 
     async def update_channel_list(self):
-        """更新频道列表"""
-        channel_list = self.query_one("#channel-list", ListView)
-        await channel_list.clear()
+        """重建频道列表"""
         self.channel_items.clear()
+        self.channel_times.clear()
+
+        rows = []
+        for channel in await self.app.backend.list_channels(list_users=self.is_bot_mode):
+            key = await self._add_item(channel, await self.app.backend.get_last_activity(channel))
+            rows.append((key, self._label_text(channel, await self.app.backend.get_unread_count(channel))))
+        channel_list = self.query_one("#channel-list", VirtualList)
+        channel_list.set_rows(rows)
+        channel_list.highlight(self._key(_store.current_channel))
+
+    async def update_channel(self, channel: Channel):
+        """更新单个频道的标签, 并将其移动到按最近活动排序后的位置"""
+        backend = self.app.backend
+        if channel.id == DIRECT.id:
+            channel = await backend.create_dm(backend.current_user)
+        if channel.id.startswith("private:"):
+            if not self.is_bot_mode and channel.id != f"private:{backend.current_user.id}":
+                return
+            if self.is_bot_mode and channel.id[8:] not in backend.storage.users:
+                return
+            channel = await backend.create_dm(await backend.get_user(channel.id[8:]))
+        elif channel.id not in backend.storage.channels:
+            return
 
-        channels_times = [
-            (
-                channel,
-                (
-                    event.time.timestamp()
-                    if (event := await self.app.backend.get_latest_chat(channel))
-                    else channel._created_at.timestamp()
-                ),
-            )
-            for channel in await self.app.backend.list_channels(list_users=self.is_bot_mode)
-        ]
-        for channel, time in sorted(channels_times, key=lambda x: x[1], reverse=True):
-            color = "auto"
-            if channel.id not in _store.check_record:
-                _store.check_record[channel.id] = datetime.now().timestamp()
-                if time != channel._created_at.timestamp():
-                    color = (
-                        "auto"
-                        if _store.current_channel and channel.id == _store.current_channel.id
-                        else "lime blink"
-                    )
-            elif time > _store.check_record[channel.id]:
-                color = (
-                    "auto"
-                    if _store.current_channel and channel.id == _store.current_channel.id
-                    else "lime blink"
-                )
-
-            if channel.id.startswith("private:"):
-                if not self.is_bot_mode:
-                    label = Label(f"{DIRECT.avatar} [{color}]{DIRECT.name}[/]", id="label-dm-direct")
-                    item = ListItem(label, id="channel-dm-direct")
-                    channel = DIRECT  # 使用 DIRECT 作为私聊频道的标识
-                    orig_user = None
-                else:
-                    label = Label(
-                        f"{channel.avatar} [{color}]{channel.name}({channel.id[8:]})[/]",
-                        id=f"label-dm-{channel.id[8:]}",
-                    )
-                    item = ListItem(label, id=f"channel-dm-{channel.id[8:]}")
-                    orig_user = await self.app.backend.get_user(channel.id[8:])
-            else:
-                label = Label(f"{channel.avatar} [{color}]{channel.name}[/]", id=f"label-{channel.id}")
-                item = ListItem(label, id=f"channel-{channel.id}")
+        key = self._key(channel)
+        time = await backend.get_last_activity(channel)
+        label = self._label_text(channel, await backend.get_unread_count(channel))
+        channel_list = self.query_one("#channel-list", VirtualList)
+        if key in self.channel_items:
+            channel_list.update(key, label)
+            if time == self.channel_times[key]:
+                return
+            self.channel_times[key] = time
+        else:
+            await self._add_item(channel, time)
+
+        # 按最近活动时间计算新位置, 最常见的情况是移动到顶部
+        keys = channel_list.keys
+        if not keys or keys[0] == key or time >= self.channel_times[keys[0]]:
+            index = 0
+        else:
+            index = sum(1 for other in keys if other != key and self.channel_times[other] > time)
+        channel_list.insert(index, key, label)
+        if channel_list.highlighted_key is None:
+            channel_list.highlight(self._key(_store.current_channel))
+
+    def _key(self, channel: Channel) -> str:
+        if not self.is_bot_mode and channel.id == f"private:{self.app.backend.current_user.id}":
+            return DIRECT.id
+        return channel.id
+
+    def _label_text(self, channel: Channel, unread: int) -> str:
+        color = self.app.setting.new_message_color if unread else "auto"
+        badge = f" [b]({unread if unread < 100 else '99+'})[/]" if unread else ""
+        if channel.id.startswith("private:"):
+            if not self.is_bot_mode:
+                return f"{DIRECT.avatar} [{color}]{DIRECT.name}[/]{badge}"
+            return f"{channel.avatar} [{color}]{escape(channel.name)}({channel.id[8:]})[/]{badge}"
+        return f"{channel.avatar} [{color}]{escape(channel.name)}[/]{badge}"
+
+    async def _add_item(self, channel: Channel, time: float) -> str:
+        if channel.id.startswith("private:"):
+            if not self.is_bot_mode:
+                channel = DIRECT  # 使用 DIRECT 作为私聊频道的标识
                 orig_user = None
+            else:
+                orig_user = await self.app.backend.get_user(channel.id[8:])
+        else:
+            orig_user = None
 
-            self.channel_items[channel.id] = (item, (channel, orig_user))
-            await channel_list.append(item)
-            if _store.current_channel and channel.id == _store.current_channel.id:
-                item.highlighted = True
+        self.channel_items[channel.id] = (channel, orig_user)
+        self.channel_times[channel.id] = time
+        return channel.id
 
-    async def on_list_view_selected(self, event: ListView.Selected):
+    async def on_virtual_list_selected(self, event: VirtualList.Selected):
         """处理列表项选择事件"""
-        if event.item and event.item.id and event.item.id.startswith("channel-"):
-            # 查找对应的频道
-            for item, slots in self.channel_items.values():
-                channel, orig_user = slots
-                if channel.id == DIRECT.id:
-                    ev = ChannelSelectorPressed(
-                        await self.app.backend.create_dm(self.app.backend.current_user),
-                        self.app.backend.current_user,
-                    )
-                else:
-                    ev = ChannelSelectorPressed(channel, orig_user)
-                if item == event.item:
-                    key = (
-                        f"dm-{channel.id[8:]}"
-                        if channel.id.startswith("private:")
-                        else ("dm-direct" if channel.id == DIRECT.id else channel.id)
-                    )
-                    label = self.query_one(f"#label-{key}", Label)
-                    label.update(label.renderable.replace("lime blink", "auto"))  # type: ignore
-                    self.post_message(ev)
-                    item.highlighted = True
-                    _store.current_channel = ev.channel
-                else:
-                    item.highlighted = False
-                _store.check_record[ev.channel.id] = datetime.now().timestamp()  # 更新最后活动时间
+        channel, orig_user = self.channel_items[event.key]
+        if channel.id == DIRECT.id:
+            ev = ChannelSelectorPressed(
+                await self.app.backend.create_dm(self.app.backend.current_user),
+                self.app.backend.current_user,
+            )
+        else:
+            ev = ChannelSelectorPressed(channel, orig_user)
+        await self.app.backend.mark_read(ev.channel)
+        event.control.update(event.key, self._label_text(ev.channel, 0))
+        self.post_message(ev)
+        _store.current_channel = ev.channel
 
     async def add_new_channel(self):
         """添加新频道的逻辑"""
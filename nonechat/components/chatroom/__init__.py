@@ -1,8 +1,17 @@
-from typing import TYPE_CHECKING, cast
+import re
+import contextlib
+from pathlib import Path
+from datetime import datetime
+from functools import partial
+from collections.abc import Callable
+from typing import TYPE_CHECKING, TextIO, cast
 
 from textual.widget import Widget
 from textual.binding import Binding
 
+from nonechat.model import DIRECT
+from nonechat.backend.export import EXPORT_SUFFIXES, ExportFormat
+
 from .input import InputBox
 from .toolbar import Toolbar
 from .history import ChatHistory
@@ -24,7 +33,10 @@ class ChatRoom(Widget):
     }
     """
 
-    BINDINGS = [Binding("ctrl+l", "clear_history", "Clear chat history")]
+    BINDINGS = [
+        Binding("ctrl+l", "clear_history", "Clear chat history"),
+        Binding("ctrl+o", "export_history", "Export chat history"),
+    ]
 
     def __init__(self):
         super().__init__()
@@ -39,6 +51,49 @@ class ChatRoom(Widget):
     async def action_clear_history(self):
         await self.history.action_clear_history()
 
+    async def action_export_history(self):
+        """导出当前频道的聊天记录"""
+        setting = self.app.setting
+        backend = self.app.backend
+        fmt = cast(ExportFormat, setting.export_format)
+        channel = backend.current_channel
+        name = re.sub(r"[^\w.-]+", "_", channel.id)
+        path = (
+            Path(setting.export_path)
+            / f"{name}-{datetime.now():%Y%m%d-%H%M%S}{EXPORT_SUFFIXES.get(fmt, '.txt')}"
+        )
+        if channel.id == DIRECT.id:
+            channel = await backend.create_dm(backend.current_user)
+        # 在事件循环中记录要导出的消息, 再在后台线程中写入文件, 导出大量记录时不阻塞界面
+        export = backend.prepare_export(channel, fmt)
+        self.run_worker(
+            partial(self._export, export, path),
+            name=f"export-{channel.id}",
+            group="export",
+            thread=True,
+            exit_on_error=False,
+        )
+
+    def _export(self, export: Callable[[TextIO], int], path: Path) -> None:
+        try:
+            with open(path, "w", encoding="utf-8") as fp:
+                count = export(fp)
+        except Exception as e:
+            # worker 不会因异常退出应用, 需要在这里提示失败并删除不完整的文件
+            with contextlib.suppress(OSError):
+                path.unlink()
+            self.app.call_from_thread(
+                self.app.notify,
+                str(e) or type(e).__name__,
+                title="Export Failed",
+                severity="error",
+                markup=False,
+            )
+            return
+        self.app.call_from_thread(
+            self.app.notify, f"{count} messages exported to {path}", title="Export", markup=False
+        )
+
     @property
     def app(self) -> "Frontend":
         return cast("Frontend", super().app)
@@ -6,6 +6,7 @@ from textual.widget import Widget
 
 from nonechat.message import Markup, ConsoleMessage
 
+from ..scroll import mount_above
 from .message import Timer, Message
 
 if TYPE_CHECKING:
@@ -29,6 +30,11 @@ class ChatHistory(Widget):
         self.last_msg: Optional[MessageEvent] = None
         self.last_time: Optional[datetime] = None
         self.is_bot_mode = self.app.is_bot_mode
+        # 当前显示的频道与已加载的最早归档页
+        self.channel: Optional[Channel] = None
+        self.archive_page: Optional[int] = None
+        self._archive_done = False
+        self._loading_archive = False
 
     @property
     def app(self) -> "Frontend":
@@ -38,6 +44,7 @@ class ChatHistory(Widget):
         await self.on_new_message(await self.app.backend.get_chat_history())
         self.app.backend.add_chat_watcher(self)
         self.app.bot_mode_watchers.append(self)
+        self.call_after_refresh(self._fill_viewport)
 
     def on_unmount(self):
         self.app.backend.remove_chat_watcher(self)
@@ -47,12 +54,41 @@ class ChatHistory(Widget):
         self.is_bot_mode = event.is_bot_mode
         await self.refresh_history()
 
+    @staticmethod
+    def _need_timer(
+        message: "MessageEvent", last_time: Optional[datetime], last_msg: "Optional[MessageEvent]"
+    ) -> bool:
+        timestamp = message.time.timestamp()
+        return (
+            not last_time
+            or timestamp - last_time.timestamp() > timedelta(minutes=5).total_seconds()
+            or (
+                last_msg is not None
+                and timestamp - last_msg.time.timestamp() > timedelta(minutes=1).total_seconds()
+            )
+        )
+
+    def _insert_before(self, message: "MessageEvent") -> Optional[Widget]:
+        """查找迟到的消息应插入在其之前的部件, 消息按时间顺序到达时返回 None"""
+        anchor: Optional[Widget] = None
+        timestamp = message.time.timestamp()
+        # 迟到的消息通常位于末尾附近, 从后往前查找
+        for child in reversed(self.children):
+            if isinstance(child, Message):
+                if child.event.time.timestamp() <= timestamp:
+                    break
+            elif not isinstance(child, Timer) or child.time.timestamp() <= timestamp:
+                break
+            anchor = child
+        return anchor
+
     async def action_new_message(self, message: "MessageEvent"):
-        if (
-            not self.last_time
-            or message.time - self.last_time > timedelta(minutes=5)
-            or (self.last_msg and message.time - self.last_msg.time > timedelta(minutes=1))
-        ):
+        if self.last_msg is not None and message.time.timestamp() < self.last_msg.time.timestamp():
+            anchor = self._insert_before(message)
+            if anchor is not None:
+                await self.mount(Message(message), before=anchor)
+                return
+        if self._need_timer(message, self.last_time, self.last_msg):
             self.mount(Timer(message.time))  # noqa
             self.last_time = message.time
         await self.mount(Message(message))
@@ -82,11 +118,63 @@ class ChatHistory(Widget):
         # 清除当前显示的消息
         self.last_msg = None
         self.last_time = None
+        self.channel = channel
+        self.archive_page = None
+        self._archive_done = False
         for msg in self.walk_children():
             await cast(Widget, msg).remove()
 
         # 重新加载当前频道的历史记录
         await self.on_new_message(await self.app.backend.get_chat_history(channel))
+        self.call_after_refresh(self._fill_viewport)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        # 滚轮, 拖动滚动条或键盘滚动到顶部时都加载更早的消息
+        if new_value <= 0 < old_value:
+            self.call_later(self.load_archived_page)
+
+    def _fill_viewport(self) -> None:
+        # 内容不足一屏时无法滚动到顶部, 直接加载更早的归档, 直到可以滚动或没有更早的消息
+        if self.max_scroll_y <= 0 and not self._archive_done and self.app.backend.storage.archive is not None:
+            self.call_later(self.load_archived_page)
+
+    async def load_archived_page(self):
+        """在顶部插入一页更早的归档消息"""
+        if self._archive_done or self._loading_archive:
+            return
+        self._loading_archive = True
+        try:
+            # 被淘汰的消息仍显示在界面上, 且最后一页归档正是这些消息, 需要跳过已显示的部分
+            shown = [child.event for child in self.children if isinstance(child, Message)]
+            oldest = shown[0].time.timestamp() if shown else None
+            shown_ids = {event.message_id for event in shown}
+            messages: list[MessageEvent] = []
+            while not messages:
+                page, archived = await self.app.backend.get_archived_history(self.channel, self.archive_page)
+                if page is None:
+                    self._archive_done = True
+                    return
+                self.archive_page = page
+                messages = [
+                    message
+                    for message in archived
+                    if message.message_id not in shown_ids
+                    and (oldest is None or message.time.timestamp() < oldest)
+                ]
+            widgets: list[Widget] = []
+            last_time: Optional[datetime] = None
+            last_msg: Optional[MessageEvent] = None
+            for message in messages:
+                if self._need_timer(message, last_time, last_msg):
+                    widgets.append(Timer(message.time))
+                    last_time = message.time
+                widgets.append(Message(message))
+                last_msg = message
+            await mount_above(self, widgets)
+            self.call_after_refresh(self._fill_viewport)
+        finally:
+            self._loading_archive = False
 
     def on_message_deleted(self, event: "MessageDeleted"):
         for msg in self.walk_children():
@@ -1,13 +1,21 @@
 from enum import Enum
 from datetime import datetime
+from functools import partial
 from typing import TYPE_CHECKING, cast
 
+from rich.segment import Segment
 from textual.widget import Widget
 from textual.widgets import Static
-from rich.console import RenderableType
+from rich.measure import Measurement
+from rich.text import Text as RichText
+from textual.worker import Worker, WorkerState, get_current_worker
+from rich.console import Console, RenderResult, ConsoleOptions, RenderableType
 
 from nonechat.utils import truncate
 from nonechat.model import User, MessageEvent
+from nonechat.message import Markdown, ConsoleMessage
+
+from ..action import Action
 
 if TYPE_CHECKING:
     from nonechat.app import Frontend
@@ -61,6 +69,9 @@ class Message(Widget):
     Message.right.-hidden {
         offset-x: 100%;
     }
+    Message.-watched Bubble {
+        border: round $warning;
+    }
     """
 
     @property
@@ -75,13 +86,17 @@ class Message(Widget):
         super().__init__(classes="left -hidden" if self.side == Side.LEFT else "right -hidden")
         self.event = event
         self.content = event.message
+        # 命中的监视关键词
+        self.highlight = self.app.backend.watch_hits.get((event.channel.id, event.message_id), ())
+        if self.highlight:
+            self.add_class("-watched")
 
     def compose(self):
         if self.side == Side.LEFT:
             yield MessageAvatar(self.event.user)
-            yield MessageInfo(self.event.user.nickname, self.content, self.side)
+            yield MessageInfo(self.event.user.nickname, self.content, self.side, self.highlight)
         else:
-            yield MessageInfo(self.event.user.nickname, self.content, self.side)
+            yield MessageInfo(self.event.user.nickname, self.content, self.side, self.highlight)
             yield MessageAvatar(self.event.user)
 
     def on_show(self):
@@ -131,10 +146,12 @@ class MessageInfo(Widget):
     }
     """
 
-    def __init__(self, nickname: str, renderable: RenderableType, side: Side):
+    def __init__(
+        self, nickname: str, renderable: RenderableType, side: Side, highlight: tuple[str, ...] = ()
+    ):
         super().__init__(classes="left" if side == Side.LEFT else "right")
         self.nickname = truncate(nickname, 20)
-        self.bubble = BubbleWrapper(renderable, side)
+        self.bubble = BubbleWrapper(renderable, side, highlight)
 
     def compose(self):
         yield Static(self.nickname)
@@ -154,14 +171,41 @@ class BubbleWrapper(Widget):
     BubbleWrapper.right {
         align-horizontal: right;
     }
+    BubbleWrapper > Action {
+        width: auto;
+        height: 1;
+        margin: 0 1;
+        color: $accent;
+    }
     """
 
-    def __init__(self, renderable: RenderableType, side: Side):
+    @property
+    def app(self) -> "Frontend":
+        return cast("Frontend", super().app)
+
+    def __init__(self, renderable: RenderableType, side: Side, highlight: tuple[str, ...] = ()):
         super().__init__(classes="left" if side == Side.LEFT else "right")
         self.content = renderable
+        self.highlight = highlight
+        self.preview = (
+            renderable.fold(self.app.setting.message_fold_lines, self.app.setting.message_fold_chars)
+            if isinstance(renderable, ConsoleMessage)
+            else None
+        )
+        self.expanded = False
 
     def compose(self):
-        yield Bubble(self.content)
+        if self.preview is None:
+            yield Bubble(self.content, self.highlight)
+        else:
+            yield Bubble(self.preview, self.highlight)
+            yield Action("▼ 展开全文", classes="fold")
+
+    def on_action_pressed(self, event: Action.Pressed):
+        event.stop()
+        self.expanded = not self.expanded
+        self.query_one(Bubble).update_content(self.content if self.expanded else self.preview)
+        event.action.update("▲ 收起" if self.expanded else "▼ 展开全文")
 
 
 class Bubble(Widget):
@@ -180,9 +224,115 @@ class Bubble(Widget):
     }
     """
 
-    def __init__(self, renderable: RenderableType):
+    @property
+    def app(self) -> "Frontend":
+        return cast("Frontend", super().app)
+
+    def __init__(self, renderable: RenderableType, highlight: tuple[str, ...] = ()):
         super().__init__()
+        self.highlight = highlight
+        self._set_content(renderable)
+
+    def _set_content(self, renderable: RenderableType) -> None:
         self.content = renderable
+        # 正在后台渲染的宽度
+        self._rendering: dict[Worker, int] = {}
+        threshold = self.app.setting.markdown_thread_threshold
+        self._heavy = (
+            [elem for elem in renderable if isinstance(elem, Markdown) and len(elem.markup) > threshold]
+            if isinstance(renderable, ConsoleMessage)
+            else []
+        )
+
+    def update_content(self, renderable: RenderableType) -> None:
+        """替换气泡内容并重新布局"""
+        self._set_content(renderable)
+        self.clear_cached_dimensions()
+        self.refresh(layout=True)
 
     def render(self):
+        if self._heavy:
+            return _DeferredContent(self)
+        if self.highlight and isinstance(self.content, ConsoleMessage):
+            return _Highlighted(self.content, self.highlight)
         return self.content
+
+    def render_in_thread(self, console: Console, options: ConsoleOptions) -> None:
+        """在后台线程中渲染过大的 Markdown 元素"""
+        width = options.max_width
+        if width in self._rendering.values():
+            return
+        # 宽度变化时 (如拖动调整窗口大小) 取消之前尚未完成的渲染
+        worker = self.run_worker(
+            partial(self._render_heavy, console, options),
+            name=f"markdown-{width}",
+            group="markdown",
+            thread=True,
+            exclusive=True,
+            exit_on_error=False,
+        )
+        self._rendering[worker] = width
+
+    def _render_heavy(self, console: Console, options: ConsoleOptions) -> int:
+        worker = get_current_worker()
+        for elem in self._heavy:
+            if worker.is_cancelled:
+                break
+            elem.render_lines(console, options)
+        return options.max_width
+
+    def on_worker_state_changed(self, event: Worker.StateChanged):
+        if event.worker.group != "markdown" or event.state not in (
+            WorkerState.SUCCESS,
+            WorkerState.ERROR,
+            WorkerState.CANCELLED,
+        ):
+            return
+        event.stop()
+        self._rendering.pop(event.worker, None)
+        if event.state == WorkerState.CANCELLED:
+            return
+        if event.state == WorkerState.ERROR:
+            # 后台渲染失败时改为直接渲染, 避免一直显示占位内容
+            self._heavy = []
+        self.clear_cached_dimensions()
+        self.refresh(layout=True)
+
+
+class _DeferredContent:
+    """在 Markdown 渲染完成前显示占位内容"""
+
+    def __init__(self, bubble: Bubble):
+        self.bubble = bubble
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+        if all(elem.is_rendered(options.max_width) for elem in self.bubble._heavy):
+            yield self.bubble.content
+            return
+        self.bubble.render_in_thread(console, options)
+        yield RichText("Markdown 渲染中...", style="dim italic")
+
+    def __rich_measure__(self, console: Console, options: ConsoleOptions) -> Measurement:
+        return Measurement.get(console, options, self.bubble.content)
+
+
+class _Highlighted:
+    """高亮消息中命中的监视关键词, Markdown 元素保持原样"""
+
+    def __init__(self, content: ConsoleMessage, words: tuple[str, ...]):
+        self.content = content
+        self.words = words
+
+    def __rich_console__(self, console: Console, options: ConsoleOptions) -> RenderResult:
+        for elem in self.content:
+            rich = None if isinstance(elem, Markdown) else elem.rich
+            if isinstance(rich, RichText):
+                rich.highlight_words(self.words, "bold reverse", case_sensitive=False)
+                yield rich
+            else:
+                yield elem
+        if self.content and not isinstance(self.content[-1], Markdown):
+            yield Segment("\n")
+
+    def __rich_measure__(self, console: Console, options: ConsoleOptions) -> Measurement:
+        return Measurement.get(console, options, self.content)
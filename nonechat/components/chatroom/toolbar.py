@@ -65,6 +65,7 @@ class Toolbar(Widget):
         self.center_title = RoomTitle()
         # self.settings_button = Action(setting.toolbar_setting, id="settings", classes="right mr")
         self.clear_button = Action(setting.toolbar_clear, id="clear", classes="right mr")
+        self.activity_button = Action(setting.toolbar_activity, id="activity", classes="right mr")
         self.log_button = Action(setting.toolbar_log, id="log", classes="right")
 
     def compose(self):
@@ -75,6 +76,7 @@ class Toolbar(Widget):
 
         # yield self.settings_button
         yield self.clear_button
+        yield self.activity_button
         yield self.log_button
 
     async def on_action_pressed(self, event: Action.Pressed):
@@ -93,6 +95,8 @@ class Toolbar(Widget):
                 self.toggle_sidebar_button.update(self.app.setting.toolbar_expand)
         # elif event.action == self.settings_button:
         #     ...
+        elif event.action == self.activity_button:
+            self.post_message(RouteChange("activity"))
         elif event.action == self.log_button:
             view: HorizontalView = cast("HorizontalView", self.app.query_one("HorizontalView"))
             if view.can_show_log:
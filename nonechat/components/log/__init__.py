@@ -1,10 +1,18 @@
+import re
 from collections.abc import Iterable
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Optional, cast
 
+from textual.timer import Timer
 from textual.widget import Widget
 from textual.events import Unmount
-from textual.widgets import RichLog
-from rich.console import RenderableType
+from textual.binding import Binding
+from textual.containers import Horizontal
+from textual.widgets import Input, Select, RichLog
+
+from nonechat.log_journal import Cursor
+from nonechat.log_redirect import LEVELS, LogEntry, LogRecord, plain_text
+
+from ..action import Action
 
 if TYPE_CHECKING:
     from nonechat.app import Frontend
@@ -12,6 +20,10 @@ if TYPE_CHECKING:
 
 
 MAX_LINES = 1000
+MAX_LINES_PER_FRAME = 200
+MAX_SCAN_PER_FRAME = 5000
+FRAME_INTERVAL = 1 / 30
+PAGE_SIZE = 200
 
 
 class LogPanel(Widget):
@@ -19,6 +31,21 @@ class LogPanel(Widget):
     LogPanel {
         layout: vertical;
     }
+    LogPanel > #log-filter {
+        height: auto;
+        width: 100%;
+    }
+    LogPanel #log-level {
+        width: 18;
+    }
+    LogPanel #log-pattern {
+        width: 1fr;
+    }
+    LogPanel #log-older {
+        width: 4;
+        height: 3;
+        content-align: center middle;
+    }
     LogPanel > TextLog {
         padding: 0 1;
         min-width: 60 !important;
@@ -26,27 +53,154 @@ class LogPanel(Widget):
     }
     """
 
+    BINDINGS = [
+        Binding("ctrl+pageup", "page_back", "Older logs", show=False),
+        Binding("ctrl+pagedown", "page_latest", "Latest logs", show=False),
+    ]
+
     def __init__(self) -> None:
         super().__init__()
         self.output = RichLog(max_lines=MAX_LINES, min_width=60, wrap=True, markup=True)
+        self.level_select: Select[int] = Select(
+            [(name, levelno) for name, levelno in LEVELS.items()], prompt="全部级别", id="log-level"
+        )
+        self.pattern_input = Input(placeholder="正则过滤", id="log-pattern")
+        self.min_level: Optional[int] = None
+        self.pattern: Optional[re.Pattern[str]] = None
+        self._seen = 0
+        self._timer: Optional[Timer] = None
+        # 仅在显示时订阅日志
+        self._subscribed = False
+        # 从日志文件中向前翻页读取的记录, 翻页期间暂停实时日志
+        self._older: list[LogEntry] = []
+        self._cursor: Optional[Cursor] = None
+        self._paged = False
 
     @property
     def app(self) -> "Frontend":
         return cast("Frontend", super().app)
 
     def compose(self):
+        with Horizontal(id="log-filter"):
+            yield self.level_select
+            yield self.pattern_input
+            if self.app.log_store.journal is not None:
+                yield Action("⏫", id="log-older")
         yield self.output
 
     def on_mount(self):
-        self.on_log(self.app.log_store.log_history)
-        self.app.log_store.add_log_watcher(self)
+        self._timer = self.set_interval(FRAME_INTERVAL, self._deliver, pause=True)
 
     def on_unmount(self, event: Unmount):
-        self.app.log_store.remove_log_watcher(self)
+        self._unsubscribe()
+
+    def on_show(self):
+        # 隐藏期间跳过的日志将从存储中补齐
+        self._subscribe()
+        self._request_frame()
+
+    def on_hide(self):
+        self._unsubscribe()
+
+    def _subscribe(self) -> None:
+        if not self._subscribed:
+            self._subscribed = True
+            self.app.log_store.add_log_watcher(self)
+
+    def _unsubscribe(self) -> None:
+        if self._subscribed:
+            self._subscribed = False
+            self.app.log_store.remove_log_watcher(self)
+
+    def on_state_change(self, event: "StateChange[tuple[LogEntry, ...]]") -> None:
+        self._request_frame()
+
+    def on_select_changed(self, event: Select.Changed) -> None:
+        event.stop()
+        self.min_level = None if event.value is Select.BLANK else cast(int, event.value)
+        self._refilter()
+
+    def on_input_changed(self, event: Input.Changed) -> None:
+        event.stop()
+        try:
+            self.pattern = re.compile(event.value, re.IGNORECASE) if event.value else None
+        except re.error:
+            self.pattern_input.add_class("-invalid")
+            return
+        self.pattern_input.remove_class("-invalid")
+        self._refilter()
+
+    def on_action_pressed(self, event: Action.Pressed) -> None:
+        event.stop()
+        if event.action.id == "log-older":
+            self.action_page_back()
+
+    def _refilter(self) -> None:
+        """过滤条件变化后, 从环形缓冲区开头重新筛选"""
+        self.output.clear()
+        if self._paged:
+            self.on_log(log for log in self._older if self._match(log))
+            self.output.scroll_home(animate=False)
+            return
+        self._seen = 0
+        self._request_frame()
+
+    def _match(self, log: LogEntry) -> bool:
+        if self.min_level is not None and not (isinstance(log, LogRecord) and log.levelno >= self.min_level):
+            return False
+        return self.pattern is None or self.pattern.search(plain_text(log)) is not None
+
+    def action_page_back(self) -> None:
+        """从日志文件中读取更早的一页记录"""
+        journal = self.app.log_store.journal
+        if journal is None:
+            return
+        if not self._paged:
+            self._paged = True
+            self._cursor = journal.cursor()
+            self.output.auto_scroll = False
+        if self._cursor is None:
+            self.app.notify("没有更早的日志了", title="Log")
+            return
+        logs, self._cursor = journal.read_before(self._cursor, PAGE_SIZE)
+        self._older[:0] = logs
+        del self._older[MAX_LINES:]
+        self._refilter()
+
+    def action_page_latest(self) -> None:
+        """回到实时日志"""
+        if not self._paged:
+            return
+        self._paged = False
+        self._older.clear()
+        self._cursor = None
+        self.output.auto_scroll = True
+        self._refilter()
+
+    def _request_frame(self) -> None:
+        if self._timer is not None:
+            self._timer.resume()
 
-    def on_state_change(self, event: "StateChange[tuple[RenderableType, ...]]") -> None:
-        self.on_log(event.data)
+    def _deliver(self) -> None:
+        """每帧最多检查 MAX_SCAN_PER_FRAME 条、写入 MAX_LINES_PER_FRAME 行新日志"""
+        store = self.app.log_store
+        if self._paged or self._seen >= store.total or not self.is_on_screen:
+            assert self._timer is not None
+            self._timer.pause()
+            return
+        logs: list[LogEntry] = []
+        seen = store.total
+        for scanned, (seq, log) in enumerate(store.since(self._seen, self.min_level), 1):
+            if self.pattern is None or self.pattern.search(plain_text(log)):
+                logs.append(log)
+            if len(logs) >= MAX_LINES_PER_FRAME or scanned >= MAX_SCAN_PER_FRAME:
+                seen = seq + 1
+                break
+        self._seen = seen
+        if logs:
+            with self.app.batch_update():
+                self.on_log(logs)
 
-    def on_log(self, logs: Iterable[RenderableType]) -> None:
+    def on_log(self, logs: Iterable[LogEntry]) -> None:
         for log in logs:
-            self.output.write(log)
+            self.output.write(self.app.log_store.render(log))
@@ -34,16 +34,17 @@ class Toolbar(Widget):
     }
     """
 
-    def __init__(self, settings: ConsoleSetting):
+    def __init__(self, settings: ConsoleSetting, title: str = "Log"):
         super().__init__()
         self.exit_button = Action(settings.toolbar_exit, id="exit", classes="left ml")
         self.back_button = Action(settings.toolbar_expand, id="back", classes="left")
+        self.title = title
         # self.settings_button = Action(settings.toolbar_setting, id="settings", classes="right")
 
     def compose(self):
         yield self.exit_button
         yield self.back_button
-        yield Static("Log", classes="center")
+        yield Static(self.title, classes="center")
         # yield self.settings_button
 
     async def on_action_pressed(self, event: Action.Pressed):
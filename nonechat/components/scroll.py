@@ -0,0 +1,12 @@
+from collections.abc import Iterable
+
+from textual.widget import Widget
+
+
+async def mount_above(container: Widget, widgets: Iterable[Widget]) -> None:
+    """在可滚动容器的顶部插入部件, 保持当前可见的内容不动"""
+    offset = container.max_scroll_y - container.scroll_y
+    await container.mount_all(widgets, before=container.children[0] if container.children else None)
+    container.call_after_refresh(
+        lambda: container.scroll_to(y=container.max_scroll_y - offset, animate=False)
+    )
@@ -0,0 +1,148 @@
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional, cast
+
+from textual.widget import Widget
+from textual.widgets import Static
+from rich.text import Text as RichText
+
+from .scroll import mount_above
+from .chatroom.message import Message
+from ..message import Markup, ConsoleMessage
+
+if TYPE_CHECKING:
+    from ..app import Frontend
+    from ..model import StateChange, MessageEvent
+    from ..backend import MessageChanged, MessageDeleted
+
+
+class ActivityEntry(Widget):
+    """时间线中的一条消息, 附带来源频道与时间"""
+
+    DEFAULT_CSS = """
+    ActivityEntry {
+        layout: vertical;
+        height: auto;
+        width: 100%;
+    }
+    ActivityEntry > Static {
+        height: 1;
+        width: 100%;
+        color: $text-muted;
+    }
+    """
+
+    def __init__(self, event: "MessageEvent"):
+        super().__init__()
+        self.event = event
+
+    def compose(self):
+        yield Static(RichText(f"{self.event.channel.name} · {self.event.time:%m-%d %H:%M:%S}"))
+        yield Message(self.event)
+
+
+class Timeline(Widget):
+    """所有频道合并后的消息时间线, 向上滚动到顶部时加载更早的消息"""
+
+    DEFAULT_CSS = """
+    Timeline {
+        layout: vertical;
+        height: 100%;
+        overflow: hidden scroll;
+        scrollbar-size-vertical: 1;
+    }
+    """
+
+    def __init__(self):
+        super().__init__()
+        # 已加载的最早消息时间
+        self.oldest: Optional[datetime] = None
+        self._done = False
+        self._loading = False
+
+    @property
+    def app(self) -> "Frontend":
+        return cast("Frontend", super().app)
+
+    async def on_mount(self):
+        await self.reload()
+        self.app.backend.add_chat_watcher(self)
+
+    def on_unmount(self):
+        self.app.backend.remove_chat_watcher(self)
+
+    async def reload(self):
+        """重新加载最近一页消息"""
+        await self.remove_children()
+        self.oldest = None
+        self._done = False
+        await self.load_older()
+        self.scroll_end(animate=False)
+
+    async def load_older(self):
+        """在顶部插入一页更早的消息"""
+        if self._done or self._loading:
+            return
+        self._loading = True
+        try:
+            page = await self.app.backend.get_timeline(self.oldest)
+            if not page:
+                self._done = True
+                return
+            self.oldest = page[0].time
+            await mount_above(self, [ActivityEntry(event) for event in page])
+        finally:
+            self._loading = False
+
+    async def on_state_change(self, event: "StateChange[tuple[MessageEvent, ...]]"):
+        if not event.data:
+            # 聊天历史被清空
+            await self.reload()
+            return
+        for message in event.data:
+            await self.insert(message)
+
+    async def insert(self, message: "MessageEvent"):
+        """将新消息插入到时间线中的对应位置"""
+        # 按时间戳比较, 避免带时区与不带时区的时间无法比较
+        timestamp = message.time.timestamp()
+        if self.oldest is not None and timestamp < self.oldest.timestamp() and not self._done:
+            # 早于已加载的范围, 翻页时会再读到
+            return
+        anchor: Optional[Widget] = None
+        for child in reversed(self.children):
+            if cast(ActivityEntry, child).event.time.timestamp() <= timestamp:
+                break
+            anchor = child
+        if anchor is not None:
+            await self.mount(ActivityEntry(message), before=anchor)
+            return
+        at_bottom = self.scroll_y >= self.max_scroll_y
+        await self.mount(ActivityEntry(message))
+        if at_bottom:
+            self.scroll_end(animate=True)
+
+    def watch_scroll_y(self, old_value: float, new_value: float) -> None:
+        super().watch_scroll_y(old_value, new_value)
+        # 滚轮, 拖动滚动条或键盘滚动到顶部时都加载更早的消息
+        if new_value <= 0 < old_value:
+            self.call_later(self.load_older)
+
+    def on_message_deleted(self, event: "MessageDeleted"):
+        for msg in self.walk_children():
+            if (
+                isinstance(msg, Message)
+                and msg.event.message_id == event.message_id
+                and msg.event.channel.id == event.channel.id
+            ):
+                msg.content = ConsoleMessage([Markup("该消息已撤回", style="dim")])
+                msg.refresh(layout=True, recompose=True)
+
+    def on_message_changed(self, event: "MessageChanged"):
+        for msg in self.walk_children():
+            if (
+                isinstance(msg, Message)
+                and msg.event.message_id == event.message_id
+                and msg.event.channel.id == event.channel.id
+            ):
+                msg.content = event.content
+                msg.refresh(layout=True, recompose=True)
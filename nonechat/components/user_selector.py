@@ -2,12 +2,15 @@ import random
 import string
 from typing import TYPE_CHECKING, Optional, cast
 
+from rich.markup import escape
 from textual.widget import Widget
+from textual.widgets import Input
 from textual.message import Message
-from textual.widgets import Label, ListItem, ListView
 
-from ..backend import BotAdd
+from ..utils import NGramIndex
 from ..model import User, Robot
+from ..backend import BotAdd, UserAdd
+from .virtual_list import VirtualList
 
 if TYPE_CHECKING:
     from ..app import Frontend, BotModeChanged
@@ -48,21 +51,22 @@ class UserSelector(Widget):
         padding: 0 1;
     }
 
-    UserSelector ListView {
-        height: 1fr;
+    UserSelector > Input {
         width: 100%;
+        margin-bottom: 1;
     }
 
-    UserSelector ListItem {
+    UserSelector VirtualList {
+        height: 1fr;
         width: 100%;
-        margin: 1;
-        text-align: center;
     }
     """
 
     def __init__(self):
         super().__init__()
-        self.user_items: dict[str, tuple[ListItem, User]] = {}
+        self.users: dict[str, User] = {}
+        self.search_index = NGramIndex()
+        self.filter = ""
         self.is_bot_mode = self.app.is_bot_mode
 
     @property
@@ -70,7 +74,8 @@ class UserSelector(Widget):
         return cast("Frontend", super().app)
 
     def compose(self):
-        yield ListView(id="user-list")
+        yield Input(placeholder="搜索昵称或 ID", id="user-filter")
+        yield VirtualList(id="user-list")
 
     async def on_mount(self):
         _store._current_user = self.app.backend.current_user
@@ -85,23 +90,29 @@ class UserSelector(Widget):
         self.app.backend.remove_bot_watcher(self)
         self.app.bot_mode_watchers.remove(self)
 
-    async def on_user_add(self, event):
-        await self.update_user_list()
+    async def on_user_add(self, event: UserAdd):
+        if not self.is_bot_mode:
+            self.add_user(event.user)
 
     async def on_bot_add(self, event: BotAdd):
-        await self.update_user_list()
+        if self.is_bot_mode:
+            self.add_user(event.bot)
 
     async def on_bot_mode_changed(self, event: "BotModeChanged"):
         """处理模式切换"""
         self.is_bot_mode = event.is_bot_mode
         await self.update_user_list()
 
-    async def update_user_list(self):
-        """更新用户列表"""
-        user_list = self.query_one("#user-list", ListView)
-        await user_list.clear()
-        self.user_items.clear()
+    def on_input_changed(self, event: Input.Changed):
+        """根据输入过滤用户列表"""
+        if event.input.id != "user-filter":
+            return
+        event.stop()
+        self.filter = event.value.strip()
+        self._show(self.search_index.search(self.filter))
 
+    async def update_user_list(self):
+        """重建用户列表"""
         # 根据模式显示不同的列表
         if self.is_bot_mode:
             # Bot 模式：显示 bot 列表
@@ -110,28 +121,42 @@ class UserSelector(Widget):
             # 普通模式：显示用户列表
             users = await self.app.backend.list_users()
 
+        self.users.clear()
+        self.search_index = NGramIndex()
         for user in users:
-            label = Label(f"{user.avatar} {user.nickname}")
-            item = ListItem(label, id=f"user-{user.id}")
-            self.user_items[user.id] = (item, user)
-            await user_list.append(item)
-
-            current_user = _store.get_current_user(self.is_bot_mode)
-            # 标记当前用户/bot
-            if current_user and user.id == current_user.id:
-                item.highlighted = True
-
-    async def on_list_view_selected(self, event: ListView.Selected):
+            self.users[user.id] = user
+            self.search_index.add(user.id, user.nickname, user.id)
+        self._show(self.search_index.search(self.filter))
+
+    def add_user(self, user: User):
+        """向列表中追加单个用户"""
+        if user.id in self.users:
+            return
+        self.users[user.id] = user
+        self.search_index.add(user.id, user.nickname, user.id)
+        if self.filter and not self.search_index.matches(user.id, self.filter):
+            return
+        user_list = self.query_one("#user-list", VirtualList)
+        user_list.append(user.id, self._label_text(user))
+        current_user = _store.get_current_user(self.is_bot_mode)
+        if current_user and user.id == current_user.id:
+            user_list.highlight(user.id)
+
+    def _show(self, user_ids: list[str]):
+        user_list = self.query_one("#user-list", VirtualList)
+        user_list.set_rows((user_id, self._label_text(self.users[user_id])) for user_id in user_ids)
+        current_user = _store.get_current_user(self.is_bot_mode)
+        # 标记当前用户/bot
+        user_list.highlight(current_user.id if current_user else None)
+
+    def _label_text(self, user: User) -> str:
+        return f"{user.avatar} {escape(user.nickname)}"
+
+    async def on_virtual_list_selected(self, event: VirtualList.Selected):
         """处理列表项选择事件"""
-        if event.item and event.item.id and event.item.id.startswith("user-"):
-            # 查找对应的用户
-            for item, user in self.user_items.values():
-                if item == event.item:
-                    self.post_message(UserSelectorPressed(user))
-                    item.highlighted = True
-                    _store.set_current_user(user, self.is_bot_mode)
-                else:
-                    item.highlighted = False
+        user = self.users[event.key]
+        self.post_message(UserSelectorPressed(user))
+        _store.set_current_user(user, self.is_bot_mode)
 
     async def add_new_user(self):
         """添加新用户的逻辑"""
@@ -0,0 +1,240 @@
+from typing import Optional
+from collections.abc import Iterable
+
+from rich.text import Text
+from textual.strip import Strip
+from textual.events import Click
+from textual.binding import Binding
+from textual.message import Message
+from textual.reactive import reactive
+from textual.geometry import Size, Region
+from textual.scroll_view import ScrollView
+
+
+class VirtualList(ScrollView, can_focus=True):
+    """虚拟列表组件, 仅渲染可见的行
+
+    列表内容由一组 (key, 标签) 组成, 标签为 Rich markup 字符串.
+    """
+
+    DEFAULT_CSS = """
+    VirtualList {
+        height: 1fr;
+        width: 100%;
+        scrollbar-size-vertical: 1;
+    }
+    VirtualList > .virtual-list--highlight {
+        color: $block-cursor-blurred-foreground;
+        background: $block-cursor-blurred-background;
+        text-style: $block-cursor-blurred-text-style;
+    }
+    VirtualList:focus > .virtual-list--highlight {
+        color: $block-cursor-foreground;
+        background: $block-cursor-background;
+        text-style: $block-cursor-text-style;
+    }
+    """
+
+    COMPONENT_CLASSES = {"virtual-list--highlight"}
+
+    BINDINGS = [
+        Binding("enter", "select_cursor", "Select", show=False),
+        Binding("up", "cursor_up", "Cursor up", show=False),
+        Binding("down", "cursor_down", "Cursor down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+    ]
+
+    index: reactive[Optional[int]] = reactive(None, always_update=True)
+
+    class Highlighted(Message):
+        """高亮行变化时发送的消息"""
+
+        def __init__(self, virtual_list: "VirtualList", key: Optional[str]) -> None:
+            super().__init__()
+            self.virtual_list = virtual_list
+            self.key = key
+
+        @property
+        def control(self) -> "VirtualList":
+            return self.virtual_list
+
+    class Selected(Message):
+        """行被选择时发送的消息"""
+
+        def __init__(self, virtual_list: "VirtualList", key: str) -> None:
+            super().__init__()
+            self.virtual_list = virtual_list
+            self.key = key
+
+        @property
+        def control(self) -> "VirtualList":
+            return self.virtual_list
+
+    def __init__(self, *, id: Optional[str] = None, classes: Optional[str] = None) -> None:
+        super().__init__(id=id, classes=classes)
+        self._keys: list[str] = []
+        self._labels: dict[str, str] = {}
+        self._texts: dict[str, Text] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._labels
+
+    @property
+    def keys(self) -> list[str]:
+        return self._keys
+
+    @property
+    def highlighted_key(self) -> Optional[str]:
+        if self.index is None or not 0 <= self.index < len(self._keys):
+            return None
+        return self._keys[self.index]
+
+    def position(self, key: str) -> int:
+        return self._keys.index(key)
+
+    def set_rows(self, rows: Iterable[tuple[str, str]]) -> None:
+        """替换全部行, 尽量保持当前高亮的 key"""
+        highlighted = self.highlighted_key
+        self._labels = dict(rows)
+        self._keys = list(self._labels)
+        self._texts.clear()
+        self._resized()
+        self.index = self._keys.index(highlighted) if highlighted in self._labels else None
+
+    def insert(self, index: int, key: str, label: str) -> None:
+        """在指定位置插入一行, 若 key 已存在则移动到该位置"""
+        if key in self._labels:
+            self.move(key, index)
+            self.update(key, label)
+            return
+        self._keys.insert(index, key)
+        self._labels[key] = label
+        if self.index is not None and index <= self.index:
+            self.set_reactive(VirtualList.index, self.index + 1)
+        self._resized()
+
+    def append(self, key: str, label: str) -> None:
+        self.insert(len(self._keys), key, label)
+
+    def move(self, key: str, index: int) -> None:
+        """将一行移动到指定位置"""
+        current = self._keys.index(key)
+        if current == index:
+            return
+        del self._keys[current]
+        self._keys.insert(index, key)
+        highlighted = self.index
+        if highlighted is not None:
+            if highlighted == current:
+                highlighted = index
+            elif current < highlighted <= index:
+                highlighted -= 1
+            elif index <= highlighted < current:
+                highlighted += 1
+            self.set_reactive(VirtualList.index, highlighted)
+        self.refresh()
+
+    def update(self, key: str, label: str) -> None:
+        """更新一行的标签"""
+        if self._labels.get(key) == label:
+            return
+        self._labels[key] = label
+        self._texts.pop(key, None)
+        self.refresh()
+
+    def remove(self, key: str) -> None:
+        if key not in self._labels:
+            return
+        current = self._keys.index(key)
+        del self._keys[current]
+        del self._labels[key]
+        self._texts.pop(key, None)
+        if self.index is not None and (current < self.index or self.index >= len(self._keys)):
+            self.set_reactive(VirtualList.index, self.index - 1 if self._keys else None)
+        self._resized()
+
+    def clear(self) -> None:
+        self.set_rows(())
+
+    def highlight(self, key: Optional[str]) -> None:
+        """高亮指定 key 的行"""
+        self.index = self._keys.index(key) if key in self._labels else None
+
+    def _resized(self) -> None:
+        self.virtual_size = Size(self.scrollable_content_region.width, len(self._keys))
+        self.refresh()
+
+    def validate_index(self, index: Optional[int]) -> Optional[int]:
+        if index is None or not self._keys:
+            return None
+        return max(0, min(index, len(self._keys) - 1))
+
+    def watch_index(self, old_index: Optional[int], new_index: Optional[int]) -> None:
+        if new_index is not None:
+            self.scroll_to_region(self._row_region(new_index), animate=False, immediate=True)
+        self.refresh()
+        self.post_message(self.Highlighted(self, self.highlighted_key))
+
+    def _row_region(self, index: int) -> Region:
+        return Region(0, index, self.scrollable_content_region.width, 1)
+
+    def on_resize(self) -> None:
+        self._texts.clear()
+        self._resized()
+
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        row = scroll_y + y
+        width = self.scrollable_content_region.width
+        if row >= len(self._keys):
+            return Strip.blank(width, self.rich_style)
+        key = self._keys[row]
+        text = self._texts.get(key)
+        if text is None:
+            text = Text.from_markup(self._labels[key], end="")
+            text.truncate(width, overflow="ellipsis")
+            text.align("center", width)
+            self._texts[key] = text
+        style = self.rich_style
+        if row == self.index:
+            style += self.get_component_rich_style("virtual-list--highlight")
+        strip = Strip(text.render(self.app.console)).apply_style(style)
+        return strip.crop_extend(scroll_x, scroll_x + width, style)
+
+    def on_click(self, event: Click) -> None:
+        offset = event.get_content_offset(self)
+        if offset is None:
+            return
+        row = self.scroll_offset.y + offset.y
+        if row < len(self._keys):
+            self.index = row
+            self.action_select_cursor()
+
+    def action_select_cursor(self) -> None:
+        key = self.highlighted_key
+        if key is not None:
+            self.post_message(self.Selected(self, key))
+
+    def action_cursor_up(self) -> None:
+        self.index = len(self._keys) - 1 if self.index is None else self.index - 1
+
+    def action_cursor_down(self) -> None:
+        self.index = 0 if self.index is None else self.index + 1
+
+    def action_first(self) -> None:
+        self.index = 0
+
+    def action_last(self) -> None:
+        self.index = len(self._keys) - 1
+
+    def action_page_up(self) -> None:
+        self.index = (self.index or 0) - self.scrollable_content_region.height
+
+    def action_page_down(self) -> None:
+        self.index = (self.index or 0) + self.scrollable_content_region.height
@@ -0,0 +1,149 @@
+import json
+import mmap
+from pathlib import Path
+from datetime import datetime
+from collections.abc import Iterable
+from typing import Union, BinaryIO, Optional
+
+from .log_redirect import LogEntry, LogRecord, plain_text
+
+SEGMENT_SIZE = 4 * 1024 * 1024
+MAX_SEGMENTS = 8
+BUFFER_SIZE = 64 * 1024
+
+# 读取位置: (分段编号, 字节偏移), 表示该偏移之前的记录尚未读取
+Cursor = tuple[int, int]
+
+
+def encode(log: LogEntry) -> bytes:
+    """将日志编码为一行 JSON, 原始输出为字符串, 结构化记录为数组"""
+    value: Union[str, list] = (
+        [log.time.timestamp(), log.level, log.levelno, log.source, log.message]
+        if isinstance(log, LogRecord)
+        else plain_text(log)
+    )
+    return json.dumps(value, ensure_ascii=False).encode() + b"\n"
+
+
+def decode(line: bytes) -> LogEntry:
+    try:
+        value = json.loads(line)
+    except ValueError:
+        # 异常退出时可能留下不完整的行
+        return line.decode(errors="replace")
+    if isinstance(value, list):
+        timestamp, level, levelno, source, message = value
+        return LogRecord(datetime.fromtimestamp(timestamp), level, levelno, source, message)
+    return value
+
+
+class LogJournal:
+    """追加写入的滚动日志文件
+
+    日志按行写入目录下的分段文件, 单个分段超过 segment_size 后切换到新分段,
+    只保留最近的 max_segments 个分段. 写入经过缓冲, 按批次落盘.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        segment_size: int = SEGMENT_SIZE,
+        max_segments: int = MAX_SEGMENTS,
+        buffer_size: int = BUFFER_SIZE,
+    ) -> None:
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.segment_size = segment_size
+        self.max_segments = max(max_segments, 1)
+        self.buffer_size = buffer_size
+        self.segments = sorted(int(file.stem) for file in self.path.glob("*.log") if file.stem.isdigit())
+        if not self.segments:
+            self.segments.append(0)
+        self._fp: Optional[BinaryIO] = None
+        self._size = 0
+        self._open(self.segments[-1])
+
+    def _file(self, segment: int) -> Path:
+        return self.path / f"{segment:08d}.log"
+
+    def _open(self, segment: int) -> None:
+        self._fp = open(self._file(segment), "ab", buffering=self.buffer_size)
+        self._size = self._fp.tell()
+        if self._size:
+            with open(self._file(segment), "rb") as file:
+                file.seek(-1, 2)
+                if file.read(1) != b"\n":
+                    self._fp.write(b"\n")
+                    self._size += 1
+
+    def write(self, logs: Iterable[LogEntry]) -> None:
+        if self._fp is None:
+            return
+        chunk: list[bytes] = []
+        for log in logs:
+            line = encode(log)
+            chunk.append(line)
+            self._size += len(line)
+            if self._size >= self.segment_size:
+                self._fp.write(b"".join(chunk))
+                chunk.clear()
+                self._rotate()
+        if chunk:
+            self._fp.write(b"".join(chunk))
+
+    def _rotate(self) -> None:
+        assert self._fp is not None
+        self._fp.close()
+        self.segments.append(self.segments[-1] + 1)
+        while len(self.segments) > self.max_segments:
+            self._file(self.segments.pop(0)).unlink(missing_ok=True)
+        self._open(self.segments[-1])
+
+    def flush(self) -> None:
+        if self._fp is not None:
+            self._fp.flush()
+
+    def close(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def cursor(self, skip: int = 0) -> Optional[Cursor]:
+        """获取跳过最新 skip 条记录后的读取位置"""
+        self.flush()
+        return self._scan((self.segments[-1], self._size), skip, None)
+
+    def read_before(self, cursor: Cursor, count: int) -> tuple[list[LogEntry], Optional[Cursor]]:
+        """读取位置之前的至多 count 条记录, 按时间顺序返回, 并返回新的读取位置
+
+        分段文件通过 mmap 反向查找换行符, 不会整体读入内存.
+        """
+        self.flush()
+        lines: list[bytes] = []
+        cursor = self._scan(cursor, count, lines)
+        lines.reverse()
+        return [decode(line) for line in lines], cursor
+
+    def _scan(self, cursor: Cursor, count: int, lines: Optional[list[bytes]]) -> Optional[Cursor]:
+        segment, end = cursor
+        while count > 0:
+            if segment not in self.segments:
+                return None
+            if end <= 0:
+                index = self.segments.index(segment)
+                if index == 0:
+                    return None
+                segment = self.segments[index - 1]
+                end = self._file(segment).stat().st_size
+                continue
+            with (
+                open(self._file(segment), "rb") as file,
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm,
+            ):
+                while count > 0 and end > 0:
+                    start = mm.rfind(b"\n", 0, end - 1) + 1
+                    if lines is not None:
+                        lines.append(mm[start:end])
+                    end = start
+                    count -= 1
+        return segment, end
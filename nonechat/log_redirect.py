@@ -1,64 +1,296 @@
+import re
+import logging
+import traceback
+from heapq import merge
+from itertools import islice
+from datetime import datetime
+from bisect import bisect_left
+from collections.abc import Iterator
+from asyncio import AbstractEventLoop
+from threading import Lock, get_ident
 from dataclasses import field, dataclass
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING, Any, Union, Optional
 
 from rich.text import Text
 from textual.widget import Widget
 from rich.console import RenderableType
 
+from .utils import slotted
 from .model import StateChange
 
+if TYPE_CHECKING:
+    from .log_journal import LogJournal
+
 MAX_LOG_RECORDS = 500
+RENDER_CACHE_SIZE = 256
+FLUSH_INTERVAL = 1 / 30
+
+LEVELS = {
+    "TRACE": 5,
+    "DEBUG": 10,
+    "INFO": 20,
+    "SUCCESS": 25,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+}
+LEVEL_STYLES = {
+    "TRACE": "cyan",
+    "DEBUG": "blue",
+    "INFO": "bold",
+    "SUCCESS": "bold green",
+    "WARNING": "bold yellow",
+    "ERROR": "bold red",
+    "CRITICAL": "bold white on red",
+}
+
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+
+@slotted
+@dataclass
+class LogRecord:
+    """结构化日志记录"""
+
+    time: datetime
+    level: str
+    levelno: int
+    source: str
+    message: str
+
+    def __rich__(self) -> Text:
+        text = Text(end="", tab_size=4)
+        text.append(self.time.strftime("%H:%M:%S"), style="green")
+        text.append(" | ")
+        text.append(f"{self.level:<8}", style=LEVEL_STYLES.get(self.level, "bold"))
+        text.append(" | ")
+        text.append(self.source, style="cyan")
+        text.append(" - ")
+        text.append(self.message, style=LEVEL_STYLES.get(self.level))
+        return text
+
+
+LogEntry = Union[LogRecord, RenderableType]
+
+
+def plain_text(log: LogEntry) -> str:
+    """获取用于过滤的纯文本内容"""
+    if isinstance(log, LogRecord):
+        return f"{log.source} - {log.message}"
+    if isinstance(log, str):
+        return ANSI_ESCAPE.sub("", log)
+    if isinstance(log, Text):
+        return log.plain
+    return ""
 
 
 @dataclass
 class LogStorage:
-    log_history: list[RenderableType] = field(default_factory=list)
+    capacity: int = MAX_LOG_RECORDS
+    log_history: deque[LogEntry] = field(init=False)
     log_watchers: list[Widget] = field(default_factory=list)
+    # 可选的日志文件, 写入的记录会同时追加到其中
+    journal: Optional["LogJournal"] = None
+    # 累计写入的记录数, 用于日志面板追踪读取位置
+    total: int = field(default=0, init=False)
+    _rendered: "OrderedDict[str, Text]" = field(default_factory=OrderedDict, init=False, repr=False)
+    # 各级别结构化记录的序号, 序号为记录写入时的 total
+    _levels: dict[int, deque[int]] = field(default_factory=dict, init=False, repr=False)
 
-    def write_log(self, *logs: RenderableType) -> None:
+    def __post_init__(self):
+        # 环形缓冲区, 超出容量时自动丢弃最旧的记录
+        self.log_history = deque(maxlen=self.capacity)
+
+    @property
+    def first(self) -> int:
+        """环形缓冲区中最旧记录的序号"""
+        return self.total - len(self.log_history)
+
+    def render(self, log: LogEntry) -> RenderableType:
+        """将原始日志行 (含 ANSI 转义) 转换为 Rich 对象, 仅在显示时调用"""
+        if isinstance(log, LogRecord):
+            return log.__rich__()
+        if not isinstance(log, str):
+            return log
+        text = self._rendered.get(log)
+        if text is None:
+            text = self._rendered[log] = Text.from_ansi(log, end="", tab_size=4)
+            if len(self._rendered) > RENDER_CACHE_SIZE:
+                self._rendered.popitem(last=False)
+        else:
+            self._rendered.move_to_end(log)
+        return text
+
+    def write_log(self, *logs: LogEntry) -> None:
+        for log in logs:
+            if isinstance(log, LogRecord):
+                self._levels.setdefault(log.levelno, deque()).append(self.total)
+            self.total += 1
         self.log_history.extend(logs)
-        if len(self.log_history) > MAX_LOG_RECORDS:
-            self.log_history = self.log_history[-MAX_LOG_RECORDS:]
+        if self.journal is not None:
+            self.journal.write(logs)
+        first = self.first
+        for index in self._levels.values():
+            while index and index[0] < first:
+                index.popleft()
         self.emit_log_watcher(*logs)
 
+    def since(self, seq: int, min_level: Optional[int] = None) -> Iterator[tuple[int, LogEntry]]:
+        """按顺序遍历序号不小于 seq 的记录
+
+        指定 min_level 时只遍历级别不低于它的结构化记录, 通过级别索引跳过其余记录.
+        """
+        first = self.first
+        start = max(seq, first)
+        if min_level is None:
+            yield from enumerate(islice(self.log_history, start - first, None), start)
+            return
+        indexes = [index for levelno, index in self._levels.items() if levelno >= min_level]
+        for current in merge(*(islice(index, bisect_left(index, start), None) for index in indexes)):
+            yield current, self.log_history[current - first]
+
     def add_log_watcher(self, watcher: Widget) -> None:
         self.log_watchers.append(watcher)
 
     def remove_log_watcher(self, watcher: Widget) -> None:
         self.log_watchers.remove(watcher)
 
-    def emit_log_watcher(self, *logs: RenderableType) -> None:
+    def emit_log_watcher(self, *logs: LogEntry) -> None:
         for watcher in self.log_watchers:
             watcher.post_message(StateChange(logs))
 
 
 class FakeIO:
-    def __init__(self, storage: LogStorage) -> None:
+    """线程安全的输出重定向, 按批次将日志交给事件循环写入存储"""
+
+    def __init__(self, storage: LogStorage, interval: float = FLUSH_INTERVAL) -> None:
         self.storage = storage
-        self._buffer: list[str] = []
+        self.interval = interval
+        self._lock = Lock()
+        # 每个线程尚未换行的内容
+        self._buffers: dict[int, list[str]] = {}
+        # 等待交给事件循环的日志
+        self._pending: list[LogEntry] = []
+        self._scheduled = False
+        self._loop: Optional[AbstractEventLoop] = None
 
     def isatty(self):
         return True
 
+    def attach(self, loop: AbstractEventLoop) -> None:
+        """绑定事件循环, 之后的日志将按批次在该循环中写入"""
+        self._loop = loop
+
+    def detach(self) -> None:
+        """解除绑定并立即写入剩余的日志"""
+        self._loop = None
+        self._drain()
+
     def write(self, string: str) -> None:
-        self._buffer.append(string)
-
-        # By default, `print` adds a "\n" suffix which results in a buffer
-        # flush. You can choose a different suffix with the `end` parameter.
-        # If you modify the `end` parameter to something other than "\n",
-        # then `print` will no longer flush automatically. However, if a
-        # string you are printing contains a "\n", that will trigger
-        # a flush after that string has been buffered, regardless of the value
-        # of `end`.
-        if "\n" in string:
-            self.flush()
+        with self._lock:
+            buffer = self._buffers.setdefault(get_ident(), [])
+            buffer.append(string)
+
+            # By default, `print` adds a "\n" suffix which results in a buffer
+            # flush. You can choose a different suffix with the `end` parameter.
+            # If you modify the `end` parameter to something other than "\n",
+            # then `print` will no longer flush automatically. However, if a
+            # string you are printing contains a "\n", that will trigger
+            # a flush after that string has been buffered, regardless of the value
+            # of `end`.
+            if "\n" not in string:
+                return
+            self._pending.append("".join(self._buffers.pop(get_ident())))
+        self._schedule()
 
     def flush(self) -> None:
-        self._write_to_storage()
-        self._buffer.clear()
+        with self._lock:
+            buffer = self._buffers.pop(get_ident(), None)
+            if not buffer:
+                return
+            self._pending.append("".join(buffer))
+        self._schedule()
+
+    def emit(self, record: LogRecord) -> None:
+        """写入一条结构化日志记录"""
+        with self._lock:
+            self._pending.append(record)
+        self._schedule()
 
-    def _write_to_storage(self) -> None:
-        self.storage.write_log(Text.from_ansi("".join(self._buffer), end="", tab_size=4))
+    def _schedule(self) -> None:
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        loop = self._loop
+        if loop is None:
+            self._drain()
+            return
+        try:
+            loop.call_soon_threadsafe(loop.call_later, self.interval, self._drain)
+        except RuntimeError:
+            # 事件循环已关闭
+            self._drain()
+
+    def _drain(self) -> None:
+        with self._lock:
+            logs, self._pending = self._pending, []
+            self._scheduled = False
+        if logs:
+            # 只保存原始字符串与记录, ANSI 解析推迟到日志面板显示时
+            self.storage.write_log(*logs)
 
     def read(self) -> str:
         self.flush()  # 确保所有内容都被写入存储
-        return "".join(self._buffer)
+        return ""
+
+
+class LoggingHandler(logging.Handler):
+    """标准库 logging 的处理器, 直接写入结构化日志记录"""
+
+    def __init__(self, io: FakeIO, level: Union[int, str] = logging.NOTSET) -> None:
+        super().__init__(level)
+        self.io = io
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            message = record.getMessage()
+            if record.exc_info:
+                message = f"{message}\n{''.join(traceback.format_exception(*record.exc_info)).rstrip()}"
+            self.io.emit(
+                LogRecord(
+                    datetime.fromtimestamp(record.created),
+                    record.levelname,
+                    record.levelno,
+                    record.name,
+                    message,
+                )
+            )
+        except Exception:
+            self.handleError(record)
+
+
+class LoguruSink:
+    """loguru 的 sink, 直接写入结构化日志记录
+
+    使用 `logger.add(frontend.log_sink)` 注册.
+    """
+
+    def __init__(self, io: FakeIO) -> None:
+        self.io = io
+
+    def __call__(self, message: Any) -> None:
+        record = message.record
+        text = record["message"]
+        if record["exception"] is not None:
+            text = f"{text}\n{''.join(traceback.format_exception(*record['exception'])).rstrip()}"
+        self.io.emit(
+            LogRecord(
+                record["time"].replace(tzinfo=None),
+                record["level"].name,
+                record["level"].no,
+                record["name"] or "",
+                text,
+            )
+        )
@@ -1,19 +1,24 @@
 from abc import ABC, abstractmethod
 from typing import Union, Optional, overload
 from collections.abc import Iterator, Sequence
-from dataclasses import field, asdict, dataclass
+from dataclasses import field, replace, dataclass
 
 from rich.style import Style
 from rich.segment import Segment
 from rich.emoji import EmojiVariant
+from rich.errors import MarkupError
 from rich.text import Text as RichText
 from rich.emoji import Emoji as RichEmoji
 from rich.markdown import Markdown as RichMarkdown
 from rich.measure import Measurement, measure_renderables
 from rich.console import Console, RenderResult, JustifyMethod, ConsoleOptions
 
+RENDER_CACHE_WIDTHS = 4
+
 
 class Element(ABC):
+    __slots__ = ()
+
     @property
     @abstractmethod
     def rich(self) -> Union[RichText, RichEmoji, RichMarkdown]:
@@ -30,6 +35,8 @@ class Element(ABC):
 
 
 class Text(Element):
+    __slots__ = ("text",)
+
     text: str
 
     def __init__(self, text: str) -> None:
@@ -46,6 +53,8 @@ class Text(Element):
 
 
 class Emoji(Element):
+    __slots__ = ("name",)
+
     name: str
 
     def __init__(self, name: str):
@@ -84,21 +93,82 @@ class Markdown(Element):
     inline_code_lexer: Optional[str] = field(default=None)
     inline_code_theme: Optional[str] = field(default=None)
 
+    def __post_init__(self):
+        self._lines: dict[int, list[list[Segment]]] = {}
+
     @property
     def rich(self) -> RichMarkdown:
-        return RichMarkdown(**asdict(self))
+        return RichMarkdown(
+            self.markup,
+            code_theme=self.code_theme,
+            justify=self.justify,
+            style=self.style,
+            hyperlinks=self.hyperlinks,
+            inline_code_lexer=self.inline_code_lexer,
+            inline_code_theme=self.inline_code_theme,
+        )
+
+    def is_rendered(self, width: int) -> bool:
+        """该宽度下的渲染结果是否已缓存"""
+        return width in self._lines
+
+    def render_lines(self, console: "Console", options: "ConsoleOptions") -> list[list[Segment]]:
+        """按宽度渲染 Markdown 并缓存结果, 可在后台线程中调用
+
+        只用于预先渲染超过 markdown_thread_threshold 的元素, 普通元素不缓存, 避免存储中的消息长期占用内存.
+        """
+        width = options.max_width
+        lines = self._lines.get(width)
+        if lines is None:
+            lines = console.render_lines(self.rich, options.update(height=None), pad=False)
+            if len(self._lines) >= RENDER_CACHE_WIDTHS:
+                self._lines.pop(next(iter(self._lines)), None)
+            self._lines[width] = lines
+        return lines
+
+    def __rich_console__(self, console: "Console", options: "ConsoleOptions") -> "RenderResult":
+        lines = self._lines.get(options.max_width)
+        if lines is None:
+            lines = console.render_lines(self.rich, options.update(height=None), pad=False)
+        for line in lines:
+            yield from line
+            yield Segment.line()
+
+    def __rich_measure__(self, console: "Console", options: "ConsoleOptions") -> Measurement:
+        # rich 的 Markdown 总是占满可用宽度, 无需解析文档
+        return Measurement(0, options.max_width)
 
     def __str__(self) -> str:
-        return str(
-            RichText.from_markup(
-                self.markup,
-                style=self.style,
-                end="",
+        # Markdown 源码不一定是合法的 rich 标记, 如 "[/INST]", 此时直接返回源码
+        try:
+            return str(
+                RichText.from_markup(
+                    self.markup,
+                    style=self.style,
+                    end="",
+                )
             )
-        )
+        except MarkupError:
+            return self.markup
+
+
+def _source(element: Element) -> Optional[str]:
+    if isinstance(element, Text):
+        return element.text
+    if isinstance(element, (Markup, Markdown)):
+        return element.markup
+    return None
+
+
+def _slice(element: Element, end: int) -> Element:
+    if isinstance(element, Text):
+        return Text(element.text[:end])
+    return replace(element, markup=_source(element)[:end])  # type: ignore
 
 
 class ConsoleMessage(Sequence[Element]):
+    __slots__ = ("content", "_measurements")
+
     @overload
     def __getitem__(self, index: int) -> Element: ...
 
@@ -121,6 +191,14 @@ class ConsoleMessage(Sequence[Element]):
             MessageChain: 以传入的序列作为所承载消息的消息链
         """
         self.content = elements
+        self._measurements: dict[int, Measurement] = {}
+
+    def invalidate(self) -> None:
+        """消息内容被原地修改后调用, 清除测量与渲染缓存"""
+        self._measurements.clear()
+        for element in self.content:
+            if isinstance(element, Markdown):
+                element._lines.clear()
 
     def __iter__(self) -> Iterator[Element]:
         yield from self.content
@@ -134,8 +212,57 @@ class ConsoleMessage(Sequence[Element]):
             yield Segment("\n")
 
     def __rich_measure__(self, console: "Console", options: "ConsoleOptions") -> Measurement:
-        measurements = [Measurement.get(console, options, element) for element in self]
-        return Measurement(sum(i.minimum for i in measurements), sum(i.maximum for i in measurements))
+        width = options.max_width
+        measurement = self._measurements.get(width)
+        if measurement is None:
+            measurements = [Measurement.get(console, options, element) for element in self]
+            measurement = Measurement(
+                sum(i.minimum for i in measurements), sum(i.maximum for i in measurements)
+            )
+            if len(self._measurements) >= RENDER_CACHE_WIDTHS:
+                self._measurements.pop(next(iter(self._measurements)), None)
+            self._measurements[width] = measurement
+        return measurement
+
+    def fold(self, max_lines: int, max_chars: int) -> Optional["ConsoleMessage"]:
+        """若消息超出行数或字符数限制, 返回截断后的预览消息, 否则返回 None
+
+        Args:
+            max_lines (int): 预览的最大行数
+            max_chars (int): 预览的最大字符数
+        """
+        preview: list[Element] = []
+        for index, element in enumerate(self.content):
+            if max_lines <= 0 or max_chars <= 0:
+                # 限制已用完, 剩余内容不为空时折叠
+                if any(_source(rest) is None or _source(rest).strip() for rest in self.content[index:]):
+                    return ConsoleMessage(preview)
+                return None
+            source = _source(element)
+            if source is None:
+                preview.append(element)
+                continue
+            end = min(len(source), max_chars)
+            pos = -1
+            for _ in range(max_lines):
+                pos = source.find("\n", pos + 1, end)
+                if pos == -1:
+                    break
+            else:
+                end = max(0, pos)
+            if end < len(source.rstrip()):
+                preview.append(_slice(element, end))
+                return ConsoleMessage(preview)
+            preview.append(element)
+            max_lines -= source.count("\n")
+            max_chars -= len(source)
+        return None
 
     def __str__(self):
         return "".join(map(str, self.content))
+
+    def plain(self) -> str:
+        """消息的原始文本, 不解析标记, Emoji 以名称表示"""
+        return "".join(
+            element.name if isinstance(element, Emoji) else _source(element) or "" for element in self.content
+        )
@@ -4,11 +4,13 @@ from dataclasses import field, dataclass
 
 from textual.message import Message
 
+from .utils import slotted
 from .message import ConsoleMessage
 
 T = TypeVar("T")
 
 
+@slotted
 @dataclass(eq=True, unsafe_hash=True)
 class User:
     """用户"""
@@ -20,6 +22,7 @@ class User:
     _created_at: datetime = field(default_factory=datetime.now, init=False)
 
 
+@slotted
 @dataclass(eq=True, unsafe_hash=True)
 class Robot(User):
     """机器人"""
@@ -28,6 +31,7 @@ class Robot(User):
     nickname: str = field(default="Bot")
 
 
+@slotted
 @dataclass(eq=True, unsafe_hash=True)
 class Channel:
     """频道信息"""
@@ -40,6 +44,7 @@ class Channel:
     _created_at: datetime = field(default_factory=datetime.now, init=False)
 
 
+@slotted
 @dataclass
 class Event:
     time: datetime
@@ -49,6 +54,7 @@ class Event:
     channel: Channel
 
 
+@slotted
 @dataclass
 class MessageEvent(Event):
     message_id: str
@@ -23,6 +23,7 @@ class ConsoleSetting:
     toolbar_clear: str = "🗑️"
     toolbar_setting: str = "⚙️"
     toolbar_log: str = "📝"
+    toolbar_activity: str = "📰"
     toolbar_fold: str = "⏪"
     toolbar_expand: str = "⏩"
     user_avatar: str = "👤"
@@ -32,6 +33,45 @@ class ConsoleSetting:
 
     new_message_color: str = "lime blink"
 
+    markdown_thread_threshold: int = 16384
+    """超过该字符数的 Markdown 元素将在后台线程中渲染"""
+    message_fold_lines: int = 40
+    """超过该行数的消息将折叠显示"""
+    message_fold_chars: int = 4000
+    """超过该字符数的消息将折叠显示"""
+    log_capacity: int = 500
+    """日志缓冲区保留的最大记录数"""
+    log_journal_path: Optional[str] = None
+    """日志文件目录, 设置后日志将同时追加写入滚动的分段文件"""
+    log_journal_segment_size: int = 4 * 1024 * 1024
+    """单个日志分段文件的最大字节数"""
+    log_journal_segments: int = 8
+    """保留的日志分段文件数"""
+    chat_journal_path: Optional[str] = None
+    """聊天记录日志目录, 设置后聊天记录将持久化, 并在启动时恢复"""
+    chat_journal_snapshot_interval: int = 10000
+    """聊天记录日志每写入该数量的记录后生成一次快照"""
+    history_archive_path: Optional[str] = None
+    """历史归档目录, 设置后超出保留数量的消息将压缩归档, 回看时按需加载"""
+    history_archive_compression: str = "zlib"
+    """历史归档的压缩算法, 可选 zlib 或 lzma"""
+    dedup_capacity: int = 10000
+    """用于识别重复投递消息而保留的最近消息标识数"""
+    watch_keywords: tuple[str, ...] = ()
+    """监视的关键词, 其他用户的消息中出现时将高亮并发出通知"""
+    watch_mentions: bool = True
+    """是否监视提及当前用户的消息 (@用户名)"""
+    watch_hits_capacity: int = 1000
+    """保留高亮信息的最近命中监视关键词的消息数"""
+    notify_window: float = 3.0
+    """新消息提示的显示时长 (秒), 期间同一频道的新消息合并到同一条提示中"""
+    notify_max_toasts: int = 3
+    """同时显示的新消息提示 (包括监视关键词提示) 数上限, 超出的频道合并为一条提示"""
+    export_path: str = "."
+    """导出聊天记录的目录"""
+    export_format: str = "markdown"
+    """导出聊天记录的格式, 可选 text, markdown, jsonl 或 html"""
+
     def __post_init__(self):
         if self.room_title is not None:
             warn(
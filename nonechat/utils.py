@@ -1,3 +1,10 @@
+from dataclasses import fields
+from typing import Any, TypeVar
+from collections.abc import Iterable
+
+T = TypeVar("T", bound=type[Any])
+
+
 def truncate(s: str, length: int = 70, kill_words: bool = True, end: str = "...") -> str:
     if len(s) <= length:
         return s
@@ -7,3 +14,84 @@ def truncate(s: str, length: int = 70, kill_words: bool = True, end: str = "..."
 
     result = s[: length - len(end)].rsplit(maxsplit=1)[0]
     return result + end
+
+
+def slotted(cls: T) -> T:
+    """为 dataclass 添加 __slots__, 等价于 Python 3.10+ 的 `dataclass(slots=True)`"""
+    inherited = {name for base in cls.__mro__[1:] for name in getattr(base, "__slots__", ())}
+    field_names = tuple(f.name for f in fields(cls))
+    cls_dict = dict(cls.__dict__)
+    cls_dict["__slots__"] = tuple(name for name in field_names if name not in inherited)
+    for name in field_names:
+        # 默认值已保存在 __init__ 中, 类属性会遮蔽 slot 描述符
+        cls_dict.pop(name, None)
+    cls_dict.pop("__dict__", None)
+    cls_dict.pop("__weakref__", None)
+    new_cls = type(cls)(cls.__name__, cls.__bases__, cls_dict)
+    new_cls.__qualname__ = cls.__qualname__
+    return new_cls
+
+
+class NGramIndex:
+    """基于 n-gram 的子串检索索引, 忽略大小写"""
+
+    def __init__(self, n: int = 2):
+        self.n = n
+        self._grams: dict[str, set[str]] = {}
+        self._texts: dict[str, str] = {}
+        self._order: dict[str, int] = {}
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def _split(self, text: str) -> set[str]:
+        # 同时索引短于 n 的前缀片段, 以支持单字符等短查询
+        return {text[i : i + size] for size in range(1, self.n + 1) for i in range(len(text) - size + 1)}
+
+    def add(self, key: str, *texts: str) -> None:
+        """添加或更新一个条目"""
+        if key in self._texts:
+            self.remove(key)
+        text = "\0".join(texts).casefold()
+        self._texts[key] = text
+        self._order[key] = self._counter
+        self._counter += 1
+        for gram in self._split(text):
+            self._grams.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        del self._order[key]
+        for gram in self._split(text):
+            keys = self._grams[gram]
+            keys.discard(key)
+            if not keys:
+                del self._grams[gram]
+
+    def matches(self, key: str, query: str) -> bool:
+        """条目是否包含 query"""
+        text = self._texts.get(key)
+        return text is not None and query.casefold() in text
+
+    def search(self, query: str) -> list[str]:
+        """返回包含 query 的条目, 按添加顺序排列"""
+        query = query.casefold()
+        if not query:
+            return list(self._texts)
+        grams = sorted(
+            (
+                self._grams.get(gram, set())
+                for gram in self._split(query)
+                if len(gram) == min(self.n, len(query))
+            ),
+            key=len,
+        )
+        if not grams:
+            return []
+        candidates: Iterable[str] = set.intersection(*grams) if len(grams) > 1 else grams[0]
+        if len(query) > self.n:
+            candidates = [key for key in candidates if query in self._texts[key]]
+        return sorted(candidates, key=self._order.__getitem__)
@@ -0,0 +1,30 @@
+from typing import TYPE_CHECKING, cast
+
+from textual.widget import Widget
+
+from ..components.timeline import Timeline
+from ..components.log.toolbar import Toolbar
+
+if TYPE_CHECKING:
+    from ..app import Frontend
+
+
+class ActivityView(Widget):
+    DEFAULT_CSS = """
+    ActivityView {
+    }
+    ActivityView > Toolbar {
+        dock: top;
+    }
+    ActivityView > Timeline {
+        padding: 0 1;
+    }
+    """
+
+    def compose(self):
+        yield Toolbar(self.app.setting, "Activity")
+        yield Timeline()
+
+    @property
+    def app(self) -> "Frontend":
+        return cast("Frontend", super().app)
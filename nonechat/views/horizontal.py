@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, cast
+from typing import TYPE_CHECKING, Optional, cast
 
 from textual.events import Resize
 from textual.widget import Widget
@@ -75,7 +75,8 @@ class HorizontalView(Widget):
         super().__init__()
         self.sidebar = Sidebar()
         self.chatroom = ChatRoom()
-        self.log_panel = LogPanel()
+        # 日志面板在首次显示时才创建
+        self.log_panel: Optional[LogPanel] = None
 
     @property
     def app(self) -> "Frontend":
@@ -84,7 +85,6 @@ class HorizontalView(Widget):
     def compose(self):
         yield self.sidebar
         yield self.chatroom
-        yield self.log_panel
 
     def on_mount(self):
         self.chatroom.toolbar.title = self.app.backend.current_channel.name
@@ -129,6 +129,11 @@ class HorizontalView(Widget):
 
     def _toggle_log_panel(self):
         show = self.can_show_log and self.show_log
+        if self.log_panel is None:
+            if not show:
+                return
+            self.log_panel = LogPanel()
+            self.mount(self.log_panel)
         self.log_panel.display = show
         self.set_class(show, "-show-log")
 